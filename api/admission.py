@@ -0,0 +1,176 @@
+import contextlib
+import math
+import random
+import secrets
+import threading
+import time
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import JsonResponse
+
+
+BUCKET_KEY = 'quezal:gen_bucket:{user_id}'
+BUCKET_LOCK_KEY = 'quezal:gen_bucket_lock:{user_id}'
+SLOT_KEY = 'quezal:gen_slot:{index}'
+
+
+def take_user_token(user_id, now=None):
+    """Token bucket per user, stored in the shared cache.
+
+    Returns ``(allowed, retry_after_seconds)``. The bucket holds
+    ``GENERATION_BURST`` tokens and refills at ``GENERATION_RATE_PER_MINUTE``.
+    """
+    capacity = settings.GENERATION_BURST
+    rate = settings.GENERATION_RATE_PER_MINUTE / 60.0
+    if capacity <= 0 or rate <= 0:
+        return True, 0
+    lock_key = BUCKET_LOCK_KEY.format(user_id=user_id)
+    # cache.add is atomic on every backend, so it doubles as a short per-user lock
+    for _ in range(20):
+        if cache.add(lock_key, 1, timeout=2):
+            break
+        time.sleep(0.005)
+    else:
+        return False, 1
+    try:
+        now = now or time.time()
+        key = BUCKET_KEY.format(user_id=user_id)
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens < 1:
+            cache.set(key, (tokens, now), timeout=int(capacity / rate) + 60)
+            return False, max(1, math.ceil((1 - tokens) / rate))
+        cache.set(key, (tokens - 1, now), timeout=int(capacity / rate) + 60)
+        return True, 0
+    finally:
+        cache.delete(lock_key)
+
+
+@lru_cache(maxsize=None)
+def worker_slots():
+    """Per-process cap that always leaves one of this worker's threads free for cheap requests.
+
+    The cache-backed slots below only bound generations across the whole
+    deployment (or per process with LocMem); this keeps a burst landing on one
+    worker from taking every thread it has.
+    """
+    return threading.BoundedSemaphore(max(settings.WORKER_THREADS - 1, 1))
+
+
+# Delete the slot only while it still holds our token; a slot that expired and was re-claimed belongs to someone else
+COMPARE_AND_DELETE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_slot_lock = threading.Lock()
+
+
+def shared_slots():
+    return isinstance(caches['default'], RedisCache)
+
+
+def slot_lock():
+    # Non-Redis backends here are per-process (LocMem), so one lock makes claim and check-then-delete atomic
+    return contextlib.nullcontext() if shared_slots() else _slot_lock
+
+
+def slot_timeout():
+    """Seconds a slot lives: the worst-case generation, never less than ``GENERATION_SLOT_TIMEOUT_SECONDS``.
+
+    The worst case is an all-difficulties generation (one call plus
+    ``GENERATION_MAX_REASKS`` per level) where every call fails over
+    through every route at the full Gemini timeout.
+    """
+    from .gemini import get_router
+    from .prompts import DIFFICULTIES
+    calls = 1 + len(DIFFICULTIES) * settings.GENERATION_MAX_REASKS
+    worst_case = calls * max(len(get_router().routes), 1) * settings.GEMINI_TIMEOUT_SECONDS
+    return int(max(settings.GENERATION_SLOT_TIMEOUT_SECONDS, worst_case + 30))
+
+
+def acquire_generation_slot():
+    """Claim a worker slot and one of ``GENERATION_MAX_IN_FLIGHT`` global slots.
+
+    Returns ``(key, token)`` or ``None`` when at capacity. Slots expire on
+    their own, so a worker killed mid-generation cannot leak capacity.
+    """
+    if not worker_slots().acquire(blocking=False):
+        return None
+    limit = settings.GENERATION_MAX_IN_FLIGHT
+    if limit <= 0:
+        return '', None
+    token = secrets.token_hex(8)
+    timeout = slot_timeout()
+    start = random.randrange(limit)
+    for offset in range(limit):
+        key = SLOT_KEY.format(index=(start + offset) % limit)
+        with slot_lock():
+            claimed = cache.add(key, token, timeout=timeout)
+        if claimed:
+            return key, token
+    worker_slots().release()
+    return None
+
+
+def _delete_if_owned(key, token):
+    if shared_slots():
+        backend = caches['default']
+        client = backend._cache
+        cache_key = backend.make_and_validate_key(key)
+        client.get_client(cache_key, write=True).eval(COMPARE_AND_DELETE, 1, cache_key, client._serializer.dumps(token))
+        return
+    with slot_lock():
+        if cache.get(key) == token:
+            cache.delete(key)
+
+
+def release_generation_slot(slot):
+    key, token = slot
+    if key:
+        _delete_if_owned(key, token)
+    worker_slots().release()
+
+
+def in_flight_generations():
+    limit = settings.GENERATION_MAX_IN_FLIGHT
+    if limit <= 0:
+        return 0
+    return len(cache.get_many([SLOT_KEY.format(index=i) for i in range(limit)]))
+
+
+def rejected(message, status, retry_after):
+    response = JsonResponse({'error': message, 'retry_after': retry_after, 'battle_status': 'ADMISSION_DENIED'}, status=status)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def generation_admission(view):
+    """Shed generation load before the request body is parsed or Gemini is called.
+
+    Over the per-user rate -> 429; all global slots busy -> 503. Both carry
+    ``Retry-After``. Unauthenticated requests fall through to the view's own 401.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        user_id = request.session.get('user_id')
+        if not user_id:
+            return view(request, *args, **kwargs)
+        # Claim capacity first so a 503 never spends the user's own rate budget
+        slot = acquire_generation_slot()
+        if slot is None:
+            return rejected('Quiz generation is at capacity. Please try again shortly.', 503,
+                            settings.GENERATION_RETRY_AFTER_SECONDS)
+        allowed, retry_after = take_user_token(user_id)
+        if not allowed:
+            release_generation_slot(slot)
+            return rejected('Too many quiz generations. Please slow down and try again shortly.', 429, retry_after)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            release_generation_slot(slot)
+    return wrapper
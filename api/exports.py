@@ -0,0 +1,114 @@
+import json
+import os
+import re
+import zipfile
+from datetime import datetime
+
+from .storage import results_storage, CHUNK_SIZE
+from .variants import render_variant_pdfs
+
+
+EXPORT_FORMATS = {
+    'json': ('json',),
+    'pdf': ('pdf',),
+    'both': ('json', 'pdf'),
+}
+
+
+class ZipStreamBuffer:
+    """Write-only sink for ``zipfile``: no ``seek`` means data descriptors, so nothing is rewritten."""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def drained(buffer):
+    data = buffer.drain()
+    if data:
+        yield data
+
+
+def archive_entry_stem(quiz):
+    original = os.path.splitext(quiz.original_filename or '')[0]
+    slug = re.sub(r'[^A-Za-z0-9._-]+', '_', original).strip('_')[:60] or 'quiz'
+    return f"{quiz.id:06d}_{slug}"
+
+
+def stream_quiz_library_zip(quizzes, formats, render_pdf):
+    """Yield a ZIP of ``quizzes`` piece by piece.
+
+    Only one quiz is held in memory at a time, so memory stays flat no
+    matter how large the library is, and the first entry's bytes leave as
+    soon as they are compressed. A ``manifest.json`` closes the archive.
+    """
+    storage = results_storage()
+    buffer = ZipStreamBuffer()
+    manifest = {'exported_at': datetime.now().isoformat(), 'formats': list(formats), 'quizzes': [], 'missing': []}
+
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for quiz in quizzes:
+            stem = archive_entry_stem(quiz)
+            if not storage.exists(quiz.result_filename):
+                manifest['missing'].append(quiz.id)
+                continue
+            entry = {
+                'id': quiz.id,
+                'original_filename': quiz.original_filename,
+                'difficulty': quiz.difficulty,
+                'mode': quiz.mode,
+                'num_questions': quiz.num_questions,
+                'created_at': quiz.created_at.isoformat(),
+                'files': [],
+            }
+            if 'json' in formats:
+                with archive.open(f"json/{stem}.json", mode='w', force_zip64=True) as target:
+                    for chunk in storage.iter_chunks(quiz.result_filename, CHUNK_SIZE):
+                        target.write(chunk)
+                        yield from drained(buffer)
+                entry['files'].append(f"json/{stem}.json")
+            if 'pdf' in formats:
+                pdf_bytes = render_pdf(json.loads(storage.read_bytes(quiz.result_filename)))
+                # PDFs are already compressed; storing them avoids wasted CPU
+                info = zipfile.ZipInfo(f"pdf/{stem}.pdf", date_time=datetime.now().timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                with archive.open(info, mode='w', force_zip64=True) as target:
+                    for start in range(0, len(pdf_bytes), CHUNK_SIZE):
+                        target.write(pdf_bytes[start:start + CHUNK_SIZE])
+                        yield from drained(buffer)
+                entry['files'].append(f"pdf/{stem}.pdf")
+            manifest['quizzes'].append(entry)
+            yield from drained(buffer)
+        archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+    yield from drained(buffer)
+
+
+def stream_variant_zip(variants, quiz_title, seed):
+    """Yield a ZIP with each variant's paper and answer key PDFs plus ``answer_keys.json``."""
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for name, pdf_bytes in render_variant_pdfs(variants, quiz_title):
+            archive.writestr(name, pdf_bytes)
+            yield from drained(buffer)
+        answer_keys = {
+            'seed': seed,
+            'variants': [{'variant': v['variant'], 'answer_key': v['answer_key']} for v in variants],
+        }
+        archive.writestr('answer_keys.json', json.dumps(answer_keys, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+    yield from drained(buffer)
@@ -0,0 +1,301 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+LATENCY_WINDOW = 50
+
+
+class Route:
+    """One (API key, model) pair plus the rolling stats used to pick between pairs."""
+
+    def __init__(self, key, model, key_index, base_url):
+        self.key = key
+        self.model = model
+        self.key_index = key_index
+        self.url = f"{base_url.rstrip('/')}/models/{model}:generateContent"
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.request_times = deque()
+        self.cooldown_until = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.quota_hits = 0
+        self.last_status = None
+
+    @property
+    def name(self):
+        # Never expose the key itself; the index is enough to find it in config
+        return f"{self.model}#key{self.key_index}"
+
+    def requests_last_minute(self, now):
+        while self.request_times and self.request_times[0] < now - 60:
+            self.request_times.popleft()
+        return len(self.request_times)
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def snapshot(self, now):
+        return {
+            'route': self.name,
+            'model': self.model,
+            'requests_last_minute': self.requests_last_minute(now),
+            'cooling_down_for': max(0, round(self.cooldown_until - now, 1)),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'successes': self.successes,
+            'failures': self.failures,
+            'quota_hits': self.quota_hits,
+            'last_status': self.last_status,
+        }
+
+
+class RouterResponse:
+    def __init__(self, status_code, body, text, route, attempts, hedged, latency_ms, discarded=None):
+        self.status_code = status_code
+        self.body = body
+        self.text = text
+        self.route = route
+        self.attempts = attempts
+        self.hedged = hedged
+        self.latency_ms = latency_ms
+        # Attempts that completed (and were billed) but whose reply was not used, e.g. a losing hedge
+        self.discarded = discarded or []
+
+    def describe(self):
+        return {
+            'route': self.route,
+            'attempts': self.attempts,
+            'hedged': self.hedged,
+            'latency_ms': self.latency_ms,
+            'status_code': self.status_code,
+        }
+
+
+class GeminiRouter:
+    """Spread generateContent calls over a pool of keys and models.
+
+    Routes are tried in model order, skipping any that are cooling down
+    after a 429 or have used up their per-minute budget. 429/5xx/network
+    errors fail over to the next route. With hedging on, a second request
+    is fired on another route once the first outlives its route's p95.
+    """
+
+    def __init__(self, keys, models, base_url, timeout=60, rpm_limit=0, quota_cooldown=60,
+                 error_cooldown=5, hedge=False, hedge_min_samples=10, hedge_workers=4, session=None):
+        self.routes = [Route(key, model, index, base_url)
+                       for model in models for index, key in enumerate(keys)]
+        self.timeout = timeout
+        self.rpm_limit = rpm_limit
+        self.quota_cooldown = quota_cooldown
+        self.error_cooldown = error_cooldown
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.session = session
+        self.lock = threading.Lock()
+        # Only hedges run here; primaries go out on the request thread, so one worker per request thread is enough
+        self.executor = ThreadPoolExecutor(max_workers=max(hedge_workers, 1), thread_name_prefix='gemini-hedge') if hedge else None
+
+    def http(self):
+        if self.session is None:
+            from .views import get_http_client
+            self.session = get_http_client().Session()
+        return self.session
+
+    def candidates(self, exclude=()):
+        now = time.monotonic()
+        with self.lock:
+            available = [
+                route for route in self.routes
+                if route not in exclude
+                and route.cooldown_until <= now
+                and (not self.rpm_limit or route.requests_last_minute(now) < self.rpm_limit)
+            ]
+        return available
+
+    def _send(self, route, payload):
+        now = time.monotonic()
+        with self.lock:
+            route.request_times.append(now)
+            # Prune here too: candidates() only prunes when an RPM limit is set
+            route.requests_last_minute(now)
+        started = time.perf_counter()
+        try:
+            response = self.http().post(
+                route.url,
+                json=payload,
+                headers={'Content-Type': 'application/json', 'X-goog-api-key': route.key},
+                timeout=self.timeout,
+            )
+        except Exception as e:
+            self._record(route, None, (time.perf_counter() - started) * 1000)
+            raise ConnectionError(f"{route.name}: {e}") from e
+        latency_ms = (time.perf_counter() - started) * 1000
+        self._record(route, response.status_code, latency_ms)
+        return response, latency_ms
+
+    def _record(self, route, status, latency_ms):
+        now = time.monotonic()
+        with self.lock:
+            route.last_status = status
+            if status == 200:
+                route.successes += 1
+                route.latencies.append(round(latency_ms, 1))
+            else:
+                route.failures += 1
+                if status == 429:
+                    route.quota_hits += 1
+                    route.cooldown_until = now + self.quota_cooldown
+                elif status is None or status in RETRYABLE_STATUS:
+                    route.cooldown_until = now + self.error_cooldown
+
+    def _hedge_delay(self, route):
+        if not self.hedge or len(route.latencies) < self.hedge_min_samples:
+            return None
+        return route.percentile(95) / 1000
+
+    def _attempt(self, route, payload, backups, discarded, on_late=None):
+        """Send on ``route`` from the calling thread; once it outlives its p95, fire a hedge on the next backup route.
+
+        The primary's reply is used when it succeeds. The hedge's reply is
+        used when the primary fails after the hedge went out. A losing hedge
+        that completes is still billed: it goes into ``discarded`` if it is
+        already done, otherwise to ``on_late`` when it finishes.
+        """
+        delay = self._hedge_delay(route)
+        if delay is None or not backups:
+            return (route, *self._send(route, payload)), False
+        hedge_route = backups[0]
+        primary_done = threading.Event()
+        hedge_sent = threading.Event()
+
+        def hedge():
+            if primary_done.wait(delay):
+                return None
+            hedge_sent.set()
+            print(f"🪁 Hedging slow Gemini route {route.name} with {hedge_route.name}")
+            return self._send(hedge_route, payload)
+
+        hedge_future = self.executor.submit(hedge)
+        primary, primary_error = None, None
+        try:
+            primary = self._send(route, payload)
+        except ConnectionError as e:
+            primary_error = e
+        finally:
+            primary_done.set()
+
+        if not hedge_sent.is_set():
+            if primary_error:
+                raise primary_error
+            return (route, *primary), False
+        backups.pop(0)
+        if primary is not None and primary[0].status_code == 200:
+            if hedge_future.done():
+                attempt = settle_losing_hedge(hedge_route, hedge_future)
+                if attempt:
+                    discarded.append(attempt)
+            else:
+                hedge_future.add_done_callback(lambda future: settle_losing_hedge(hedge_route, future, on_late))
+            return (route, *primary), True
+        try:
+            hedged = hedge_future.result()
+        except ConnectionError:
+            if primary_error:
+                raise primary_error
+            return (route, *primary), True
+        if hedged[0].status_code == 200 or primary is None:
+            return (hedge_route, *hedged), True
+        hedged[0].close()
+        return (route, *primary), True
+
+    def generate(self, payload, on_late=None):
+        """POST ``payload`` to the best available route; returns a ``RouterResponse`` or ``None`` if no route is usable.
+
+        ``on_late`` is called with a completed attempt that finishes after
+        this returns (a losing hedge), so its usage can still be recorded.
+        """
+        queue = self.candidates()
+        discarded = []
+        attempts = 0
+        hedged_any = False
+        last = None
+        while queue:
+            route = queue.pop(0)
+            attempts += 1
+            try:
+                (served_by, response, latency_ms), hedged = self._attempt(route, payload, queue, discarded, on_late)
+            except ConnectionError as e:
+                print(f"⚠️ Gemini route failed, failing over: {e}")
+                continue
+            hedged_any = hedged_any or hedged
+            try:
+                body = response.json() if response.status_code == 200 else None
+            except ValueError:
+                body = None
+            last = RouterResponse(response.status_code, body, response.text, served_by.name,
+                                  attempts, hedged_any, round(latency_ms, 1), discarded)
+            if response.status_code not in RETRYABLE_STATUS:
+                return last
+            print(f"⚠️ Gemini route {served_by.name} returned {response.status_code}, failing over")
+        return last
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self.lock:
+            return [route.snapshot(now) for route in self.routes]
+
+
+def completed_attempt(route, response, latency_ms):
+    """Describe a finished attempt whose reply was not used; only a 200 carries billed usage."""
+    if response.status_code != 200:
+        return None
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    return {'route': route.name, 'status_code': response.status_code, 'latency_ms': round(latency_ms, 1), 'body': body}
+
+
+def settle_losing_hedge(route, future, on_late=None):
+    """Close a hedge that lost and describe it if it completed, since it is billed either way."""
+    try:
+        result = future.result()
+    except Exception:
+        return None
+    if result is None:
+        return None
+    response, latency_ms = result
+    attempt = completed_attempt(route, response, latency_ms)
+    response.close()
+    if attempt and on_late:
+        on_late(attempt)
+    return attempt
+
+
+def split_setting(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+@lru_cache(maxsize=None)
+def get_router():
+    keys = split_setting(settings.GEMINI_API_KEYS)
+    return GeminiRouter(
+        keys=keys,
+        models=split_setting(settings.GEMINI_MODELS) or ['gemini-flash-latest'],
+        base_url=settings.GEMINI_API_BASE,
+        timeout=settings.GEMINI_TIMEOUT_SECONDS,
+        rpm_limit=settings.GEMINI_KEY_RPM_LIMIT,
+        quota_cooldown=settings.GEMINI_QUOTA_COOLDOWN_SECONDS,
+        hedge=settings.GEMINI_HEDGE_ENABLED,
+        hedge_min_samples=settings.GEMINI_HEDGE_MIN_SAMPLES,
+        hedge_workers=settings.WORKER_THREADS,
+    )
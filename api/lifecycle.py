@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Quiz
+from .storage import upload_storage, results_storage
+
+
+GC_LOCK_KEY = 'quezal:storage_gc_lock'
+TEMP_PREFIX = '.tmp_'
+
+_gc_thread = None
+
+
+def delete_quiz_blobs(result_filename, upload_filename=None):
+    """Remove the archive and raw upload belonging to a quiz; missing blobs are ignored."""
+    for storage, name in ((results_storage(), result_filename), (upload_storage(), upload_filename)):
+        if not name:
+            continue
+        try:
+            storage.delete(name)
+        except Exception as e:
+            print(f"⚠️ Failed to delete blob {name}: {e}")
+
+
+def delete_quizzes(user_id, quiz_ids):
+    """Delete the user's quizzes in one transaction and drop their blobs once it commits.
+
+    Returns ``(deleted_ids, missing_ids)``; ids that do not exist or belong to
+    someone else are reported as missing rather than failing the batch.
+    """
+    quiz_ids = list(dict.fromkeys(quiz_ids))
+    with transaction.atomic():
+        quizzes = list(
+            Quiz.objects.select_for_update()
+            .filter(user_id=user_id, id__in=quiz_ids)
+            .values_list('id', 'result_filename', 'upload_filename')
+        )
+        deleted_ids = [quiz_id for quiz_id, _, _ in quizzes]
+        Quiz.objects.filter(id__in=deleted_ids).delete()
+        # Quizzes generated together at several difficulties share one upload; keep it while any survive
+        shared = set(
+            Quiz.objects.filter(upload_filename__in=[upload for _, _, upload in quizzes if upload])
+            .values_list('upload_filename', flat=True)
+        )
+        blobs = [(result, None if upload in shared else upload) for _, result, upload in quizzes]
+        # Blob deletes are not transactional, so only run them after the rows are gone for good
+        transaction.on_commit(lambda: [delete_quiz_blobs(result, upload) for result, upload in blobs])
+    deleted = set(deleted_ids)
+    missing_ids = [quiz_id for quiz_id in quiz_ids if quiz_id not in deleted]
+    return deleted_ids, missing_ids
+
+
+def _plan_area(storage, referenced, orphan_cutoff, expiry_cutoff=None):
+    plan = []
+    for name, size, modified in storage.scan():
+        if name.startswith(TEMP_PREFIX):
+            reason = 'stale_temp' if modified < orphan_cutoff else None
+        elif expiry_cutoff is not None and modified < expiry_cutoff:
+            reason = 'retention_expired'
+        elif name not in referenced and modified < orphan_cutoff:
+            reason = 'orphaned'
+        else:
+            reason = None
+        if reason:
+            plan.append({'name': name, 'size': size, 'modified': modified.isoformat(), 'reason': reason})
+    return plan
+
+
+def collect_garbage(dry_run=True, grace_seconds=None, retention_days=None, now=None):
+    """Find (and unless ``dry_run``, delete) blobs nothing needs any more.
+
+    * result archives not referenced by any ``Quiz`` row
+    * raw uploads older than the retention window, or never attached to a quiz
+    * temp files left behind by interrupted writes
+
+    Anything younger than the grace period is left alone so in-flight
+    uploads are never collected before their ``Quiz`` row is written.
+    """
+    now = now or datetime.now(timezone.utc)
+    if grace_seconds is None:
+        grace_seconds = settings.STORAGE_ORPHAN_GRACE_SECONDS
+    if retention_days is None:
+        retention_days = settings.STORAGE_UPLOAD_RETENTION_DAYS
+    orphan_cutoff = now - timedelta(seconds=grace_seconds)
+    expiry_cutoff = now - timedelta(days=retention_days) if retention_days > 0 else None
+
+    referenced_results = set(Quiz.objects.values_list('result_filename', flat=True))
+    referenced_uploads = set(Quiz.objects.exclude(upload_filename=None).values_list('upload_filename', flat=True))
+
+    report = {
+        'dry_run': dry_run,
+        'generated_at': now.isoformat(),
+        'results': _plan_area(results_storage(), referenced_results, orphan_cutoff),
+        'uploads': _plan_area(upload_storage(), referenced_uploads, orphan_cutoff, expiry_cutoff),
+    }
+    report['files'] = len(report['results']) + len(report['uploads'])
+    report['bytes'] = sum(item['size'] for item in report['results'] + report['uploads'])
+
+    if not dry_run:
+        for area, storage in (('results', results_storage()), ('uploads', upload_storage())):
+            for item in report[area]:
+                try:
+                    storage.delete(item['name'])
+                except Exception as e:
+                    item['error'] = str(e)
+        expired = [item['name'] for item in report['uploads'] if item['reason'] == 'retention_expired']
+        if expired:
+            Quiz.objects.filter(upload_filename__in=expired).update(upload_filename=None)
+    return report
+
+
+def run_scheduled_gc():
+    """Run one GC pass unless another process already took this interval's lock."""
+    interval = settings.STORAGE_GC_INTERVAL_SECONDS
+    if not cache.add(GC_LOCK_KEY, 1, timeout=max(interval - 1, 1)):
+        return None
+    report = collect_garbage(dry_run=False)
+    if report['files']:
+        print(f"🧹 Storage GC removed {report['files']} files ({report['bytes']} bytes)")
+    return report
+
+
+def _gc_loop(interval):
+    # Jitter the first run so freshly forked workers do not all scan at once
+    time.sleep(random.uniform(0, min(interval, 60)))
+    while True:
+        try:
+            run_scheduled_gc()
+        except Exception as e:
+            print(f"⚠️ Storage GC pass failed: {e}")
+        time.sleep(interval)
+
+
+def start_background_gc():
+    global _gc_thread
+    interval = settings.STORAGE_GC_INTERVAL_SECONDS
+    if interval <= 0 or (_gc_thread is not None and _gc_thread.is_alive()):
+        return _gc_thread
+    _gc_thread = threading.Thread(target=_gc_loop, args=(interval,), name='quezal-storage-gc', daemon=True)
+    _gc_thread.start()
+    return _gc_thread
@@ -0,0 +1,73 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.gemini import get_router
+from api.parsing import salvage_questions
+from api.prompts import PROMPT_COMPILERS, get_prompt
+from api.views import extract_generated_text, extract_text_from_pdf
+
+
+class Command(BaseCommand):
+    help = 'Compare prompt versions: input/output tokens, latency and valid questions per quiz'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pdf', help='PDF used as the quiz source')
+        parser.add_argument('--versions', default='v1,v2')
+        parser.add_argument('--mode', default='mixed')
+        parser.add_argument('--difficulty', default='Medium')
+        parser.add_argument('--num-questions', type=int, default=8)
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--offline', action='store_true',
+                            help='Only compare prompt sizes (chars/4 token estimate); no Gemini calls')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        source = extract_text_from_pdf(options['pdf'])
+        if not source:
+            raise CommandError('Could not extract text from the PDF')
+        versions = [v.strip() for v in options['versions'].split(',') if v.strip()]
+        unknown = [v for v in versions if v not in PROMPT_COMPILERS]
+        if unknown:
+            raise CommandError(f'Unknown prompt versions: {", ".join(unknown)}')
+
+        results = {}
+        for version in versions:
+            prompt = get_prompt(options['mode'], options['difficulty'], version)
+            payload = prompt.payload(options['num_questions'], source)
+            prompt_chars = len(payload['contents'][0]['parts'][0]['text'])
+            row = {'prompt_chars': prompt_chars, 'estimated_input_tokens': prompt_chars // 4}
+            if not options['offline']:
+                row.update(self.measure(payload, options))
+            results[version] = row
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for version, row in results.items():
+            self.stdout.write(f"📏 {version}: " + ', '.join(f"{k}={v}" for k, v in row.items()))
+
+    def measure(self, payload, options):
+        router = get_router()
+        if not router.routes:
+            raise CommandError('No Gemini API keys configured')
+        input_tokens, output_tokens, latencies, valid = [], [], [], []
+        for _ in range(max(1, options['runs'])):
+            started = time.perf_counter()
+            response = router.generate(payload)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response is None or response.status_code != 200:
+                raise CommandError(f'Gemini call failed: {response.status_code if response else "no route available"}')
+            usage = response.body.get('usageMetadata', {})
+            input_tokens.append(usage.get('promptTokenCount', 0))
+            output_tokens.append(usage.get('candidatesTokenCount', 0))
+            text = extract_generated_text(response.body) or ''
+            valid.append(len(salvage_questions(text)['questions']))
+        return {
+            'input_tokens': statistics.median(input_tokens),
+            'output_tokens': statistics.median(output_tokens),
+            'latency_ms_median': round(statistics.median(latencies), 1),
+            'valid_questions_median': statistics.median(valid),
+        }
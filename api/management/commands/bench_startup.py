@@ -0,0 +1,69 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+IMPORT_PROBE = """
+import os, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import config.wsgi
+print(round((time.perf_counter() - start) * 1000, 2))
+"""
+
+FIRST_RESPONSE_PROBE = """
+import os, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+import config.wsgi
+from django.test import Client
+response = Client().get({path!r}, HTTP_HOST='localhost')
+print(round((time.perf_counter() - start) * 1000, 2), response.status_code)
+"""
+
+
+class Command(BaseCommand):
+    help = 'Measure cold import time and time-to-first-response in fresh interpreters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--path', default='/api/battle-health')
+        parser.add_argument('--json', action='store_true', help='Emit machine-readable results')
+
+    def run_probe(self, code):
+        out = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip().splitlines()[-1].split()
+
+    def handle(self, *args, **options):
+        runs = max(1, options['runs'])
+        import_ms = []
+        first_response_ms = []
+        status = None
+        for _ in range(runs):
+            import_ms.append(float(self.run_probe(IMPORT_PROBE)[0]))
+            elapsed, status = self.run_probe(FIRST_RESPONSE_PROBE.format(path=options['path']))
+            first_response_ms.append(float(elapsed))
+
+        results = {
+            'runs': runs,
+            'path': options['path'],
+            'status_code': int(status),
+            'import_ms': {'median': statistics.median(import_ms), 'max': max(import_ms)},
+            'first_response_ms': {'median': statistics.median(first_response_ms), 'max': max(first_response_ms)},
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        self.stdout.write(f"⏱️ Import time: median {results['import_ms']['median']}ms, max {results['import_ms']['max']}ms")
+        self.stdout.write(f"⚡ Time to first response ({options['path']} -> {results['status_code']}): "
+                          f"median {results['first_response_ms']['median']}ms, max {results['first_response_ms']['max']}ms")
@@ -0,0 +1,32 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from api.lifecycle import collect_garbage
+
+
+class Command(BaseCommand):
+    help = 'Remove orphaned archives, expired uploads and stale temp files from blob storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+        parser.add_argument('--grace-seconds', type=int, default=None,
+                            help='Ignore files younger than this (defaults to STORAGE_ORPHAN_GRACE_SECONDS)')
+        parser.add_argument('--retention-days', type=int, default=None,
+                            help='Raw upload retention (defaults to STORAGE_UPLOAD_RETENTION_DAYS, 0 keeps forever)')
+        parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+
+    def handle(self, *args, **options):
+        report = collect_garbage(
+            dry_run=options['dry_run'],
+            grace_seconds=options['grace_seconds'],
+            retention_days=options['retention_days'],
+        )
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        for area in ('results', 'uploads'):
+            for item in report[area]:
+                self.stdout.write(f"  {area}/{item['name']} ({item['size']} bytes, {item['reason']})")
+        self.stdout.write(self.style.SUCCESS(f"🧹 {verb} {report['files']} files, {report['bytes']} bytes"))
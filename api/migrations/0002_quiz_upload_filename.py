@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='upload_filename',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
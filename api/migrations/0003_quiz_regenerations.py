@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_quiz_upload_filename'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='regenerations',
+            field=models.IntegerField(default=0),
+        ),
+    ]
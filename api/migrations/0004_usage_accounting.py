@@ -0,0 +1,55 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_quiz_regenerations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='daily_token_budget',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='GenerationRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('route', models.CharField(blank=True, max_length=255, null=True)),
+                ('prompt_version', models.CharField(blank=True, max_length=20, null=True)),
+                ('status_code', models.IntegerField(blank=True, null=True)),
+                ('prompt_tokens', models.IntegerField(default=0)),
+                ('response_tokens', models.IntegerField(default=0)),
+                ('total_tokens', models.IntegerField(default=0)),
+                ('latency_ms', models.FloatField(default=0)),
+                ('cost_usd', models.DecimalField(decimal_places=6, default=0, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generations', to='api.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.user')),
+            ],
+            options={
+                'db_table': 'generation_records',
+            },
+        ),
+        migrations.CreateModel(
+            name='UsageDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('generations', models.IntegerField(default=0)),
+                ('prompt_tokens', models.IntegerField(default=0)),
+                ('response_tokens', models.IntegerField(default=0)),
+                ('total_tokens', models.IntegerField(default=0)),
+                ('latency_ms', models.FloatField(default=0)),
+                ('cost_usd', models.DecimalField(decimal_places=6, default=0, max_digits=12)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.user')),
+            ],
+            options={
+                'db_table': 'usage_daily',
+                'unique_together': {('user', 'day')},
+            },
+        ),
+    ]
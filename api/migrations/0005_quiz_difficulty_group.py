@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_usage_accounting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='difficulty_group',
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+    ]
@@ -5,6 +5,7 @@ class User(models.Model):
     name = models.CharField(max_length=255, null=True, blank=True)
     password_hash = models.CharField(max_length=255)
     user_type = models.CharField(max_length=50, default='student')
+    daily_token_budget = models.IntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -14,10 +15,43 @@ class Quiz(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     result_filename = models.CharField(max_length=255)
     original_filename = models.CharField(max_length=255, null=True, blank=True)
+    upload_filename = models.CharField(max_length=255, null=True, blank=True)
     num_questions = models.IntegerField()
     difficulty = models.CharField(max_length=50)
     mode = models.CharField(max_length=50)
+    regenerations = models.IntegerField(default=0)
+    difficulty_group = models.CharField(max_length=32, null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'quizzes'
+
+class GenerationRecord(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    quiz = models.ForeignKey(Quiz, on_delete=models.SET_NULL, null=True, blank=True, related_name='generations')
+    route = models.CharField(max_length=255, null=True, blank=True)
+    prompt_version = models.CharField(max_length=20, null=True, blank=True)
+    status_code = models.IntegerField(null=True, blank=True)
+    prompt_tokens = models.IntegerField(default=0)
+    response_tokens = models.IntegerField(default=0)
+    total_tokens = models.IntegerField(default=0)
+    latency_ms = models.FloatField(default=0)
+    cost_usd = models.DecimalField(max_digits=12, decimal_places=6, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'generation_records'
+
+class UsageDaily(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    day = models.DateField()
+    generations = models.IntegerField(default=0)
+    prompt_tokens = models.IntegerField(default=0)
+    response_tokens = models.IntegerField(default=0)
+    total_tokens = models.IntegerField(default=0)
+    latency_ms = models.FloatField(default=0)
+    cost_usd = models.DecimalField(max_digits=12, decimal_places=6, default=0)
+
+    class Meta:
+        db_table = 'usage_daily'
+        unique_together = ('user', 'day')
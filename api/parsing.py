@@ -0,0 +1,193 @@
+import json
+import re
+
+
+TRAILING_COMMA = re.compile(r',\s*([}\]])')
+MCQ_LETTERS = ['A', 'B', 'C', 'D']
+QUESTION_TYPES = ('mcq', 'true_false', 'fill_blank', 'essay')
+
+_decoder = json.JSONDecoder()
+
+
+def strip_code_fences(text):
+    text = text.strip()
+    if text.startswith("```"):
+        text = text[7:] if text.startswith("```json") else text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def _decode_items(text, start):
+    """Decode consecutive JSON values of an array starting after ``[``; stop at the first broken one."""
+    items = []
+    pos = start
+    length = len(text)
+    while pos < length:
+        while pos < length and text[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= length or text[pos] == ']':
+            break
+        try:
+            item, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            # Truncated or mangled tail: keep what decoded cleanly so far
+            break
+        items.append(item)
+    return items
+
+
+def extract_question_items(text):
+    """Pull question objects out of an AI reply, tolerating prose, fences, trailing commas and truncation.
+
+    Returns ``(items, repaired)`` where ``repaired`` is True when the reply
+    was not valid JSON as-is.
+    """
+    if not text:
+        return [], False
+    cleaned = strip_code_fences(text)
+    try:
+        data = json.loads(cleaned)
+        if isinstance(data, dict) and isinstance(data.get('questions'), list):
+            return data['questions'], False
+        if isinstance(data, list):
+            return data, False
+    except json.JSONDecodeError:
+        pass
+
+    cleaned = TRAILING_COMMA.sub(r'\1', cleaned)
+    match = re.search(r'"questions"\s*:\s*\[', cleaned)
+    if match:
+        return _decode_items(cleaned, match.end()), True
+    bracket = cleaned.find('[')
+    if bracket != -1:
+        return _decode_items(cleaned, bracket + 1), True
+    return [], True
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else ''
+
+
+def normalize_question(q, allowed_types=None):
+    """Validate one question against its type's schema; returns ``(question, None)`` or ``(None, reason)``."""
+    if not isinstance(q, dict):
+        return None, 'not an object'
+    question = _text(q.get('question'))
+    qtype = _text(q.get('type')).lower() or 'mcq'
+    answer = q.get('correct_answer')
+    answer = _text(answer) if not isinstance(answer, bool) else ('True' if answer else 'False')
+    if not question:
+        return None, 'missing question'
+    if qtype not in QUESTION_TYPES:
+        return None, f'unknown type {qtype}'
+    if allowed_types and qtype not in allowed_types:
+        return None, f'unexpected type {qtype}'
+    if not answer:
+        return None, 'missing correct_answer'
+    options = q.get('options') or []
+    if not isinstance(options, list):
+        return None, 'options is not a list'
+    options = [_text(opt) for opt in options]
+
+    if qtype == 'mcq':
+        if len(options) != 4 or not all(options):
+            return None, 'mcq needs exactly 4 options'
+        letter = answer[:1].upper()
+        if letter not in MCQ_LETTERS or (len(answer) > 1 and answer[1] not in ')].: '):
+            # Answer given as option text instead of a letter
+            matches = [i for i, opt in enumerate(options) if opt.lower().endswith(answer.lower())]
+            if len(matches) != 1:
+                return None, 'mcq answer does not match an option'
+            letter = MCQ_LETTERS[matches[0]]
+        answer = letter
+    elif qtype == 'true_false':
+        if answer.lower() not in ('true', 'false'):
+            return None, 'true_false answer must be True or False'
+        answer = answer.capitalize()
+        options = ['True', 'False']
+    else:
+        options = []
+
+    return {
+        'question': question,
+        'type': qtype,
+        'options': options,
+        'correct_answer': answer,
+        'explanation': _text(q.get('explanation')),
+    }, None
+
+
+def validate_items(items, allowed_types=None, seen=None):
+    """Keep every valid, non-duplicate question from decoded ``items``; returns ``(valid, rejected)``."""
+    seen = seen if seen is not None else set()
+    valid, rejected = [], []
+    for item in items:
+        question, reason = normalize_question(item, allowed_types)
+        if question is None:
+            rejected.append(reason)
+            continue
+        fingerprint = ' '.join(question['question'].lower().split())
+        if fingerprint in seen:
+            rejected.append('duplicate')
+            continue
+        seen.add(fingerprint)
+        valid.append(question)
+    return valid, rejected
+
+
+def salvage_questions(text, allowed_types=None, seen=None):
+    """Parse an AI reply and keep every valid, non-duplicate question.
+
+    ``seen`` is a set of normalised question texts already accepted; it is
+    updated in place so re-asks never add a question twice.
+    """
+    items, repaired = extract_question_items(text)
+    valid, rejected = validate_items(items, allowed_types, seen)
+    return {'questions': valid, 'rejected': rejected, 'repaired': repaired}
+
+
+def _set_items(value):
+    if isinstance(value, dict) and isinstance(value.get('questions'), list):
+        return value['questions']
+    return value if isinstance(value, list) else []
+
+
+def extract_difficulty_sets(text, levels):
+    """Pull one item list per level out of a ``{"easy": {"questions": [...]}, ...}`` reply.
+
+    Returns ``({level: items}, repaired)``. A truncated reply still yields
+    every level that was written before the cut.
+    """
+    if not text:
+        return {level: [] for level in levels}, False
+    cleaned = strip_code_fences(text)
+    try:
+        data = json.loads(cleaned)
+        if isinstance(data, dict):
+            lowered = {str(key).lower(): value for key, value in data.items()}
+            return {level: _set_items(lowered.get(level.lower())) for level in levels}, False
+    except json.JSONDecodeError:
+        pass
+
+    cleaned = TRAILING_COMMA.sub(r'\1', cleaned)
+    sets = {}
+    for level in levels:
+        match = re.search(rf'"{level.lower()}"\s*:\s*(?:\{{\s*"questions"\s*:\s*)?\[', cleaned, re.IGNORECASE)
+        sets[level] = _decode_items(cleaned, match.end()) if match else []
+    return sets, True
+
+
+def salvage_difficulty_sets(text, levels, allowed_types=None, seen=None):
+    """``salvage_questions`` for a multi-difficulty reply: ``{level: {'questions', 'rejected', 'repaired'}}``.
+
+    ``seen`` is shared across levels, so a question repeated at two
+    difficulties is only kept at the first one.
+    """
+    sets, repaired = extract_difficulty_sets(text, levels)
+    seen = seen if seen is not None else set()
+    salvaged = {}
+    for level in levels:
+        valid, rejected = validate_items(sets[level], allowed_types, seen)
+        salvaged[level] = {'questions': valid, 'rejected': rejected, 'repaired': repaired}
+    return salvaged
@@ -0,0 +1,71 @@
+from functools import lru_cache
+from io import BytesIO
+from types import SimpleNamespace
+from xml.sax.saxutils import escape
+
+# Kept free of Django imports so worker processes can render PDFs without setting Django up.
+
+
+@lru_cache(maxsize=None)
+def get_reportlab():
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.units import inch
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+    return SimpleNamespace(
+        letter=letter,
+        canvas=canvas,
+        inch=inch,
+        styles=getSampleStyleSheet(),
+        Paragraph=Paragraph,
+        SimpleDocTemplate=SimpleDocTemplate,
+        Spacer=Spacer,
+    )
+
+
+def generate_quiz_pdf(archive: dict, include_answers: bool = True) -> bytes:
+    try:
+        rl = get_reportlab()
+        inch = rl.inch
+        
+        buffer = BytesIO()
+        doc = rl.SimpleDocTemplate(buffer, pagesize=rl.letter, leftMargin=0.75*inch, rightMargin=0.75*inch, topMargin=0.75*inch, bottomMargin=0.75*inch)
+        styles = rl.styles
+        story = []
+
+        title = archive.get('title') or 'Quezal Quiz'
+        # Titles come from uploaded filenames and questions from Gemini, so every
+        # field is escaped to keep it out of Paragraph's markup
+        story.append(rl.Paragraph(f"<b>{escape(title)}</b>", styles['Title']))
+        story.append(rl.Spacer(1, 0.2*inch))
+
+        battle_data = archive.get('battle_data', {})
+        questions = battle_data.get('questions', [])
+        for idx, q in enumerate(questions, start=1):
+            story.append(rl.Paragraph(f"<b>Q{idx}.</b> {escape(str(q.get('question','')))}", styles['Heading4']))
+            opts = q.get('options') or []
+            if opts:
+                for opt in opts:
+                    story.append(rl.Paragraph(f"- {escape(str(opt))}", styles['Normal']))
+            story.append(rl.Spacer(1, 0.1*inch))
+            if include_answers:
+                story.append(rl.Paragraph(f"<b>Answer:</b> {escape(str(q.get('correct_answer','')))}", styles['Normal']))
+                story.append(rl.Paragraph(f"<b>Explanation:</b> {escape(str(q.get('explanation','')))}", styles['Normal']))
+            story.append(rl.Spacer(1, 0.2*inch))
+
+        doc.build(story)
+        pdf = buffer.getvalue()
+        buffer.close()
+        return pdf
+    except Exception as e:
+        try:
+            rl = get_reportlab()
+            buf = BytesIO()
+            c = rl.canvas.Canvas(buf, pagesize=rl.letter)
+            c.drawString(72, 750, "Quezal Quiz")
+            c.drawString(72, 730, f"Error generating PDF: {e}")
+            c.save()
+            return buf.getvalue()
+        except Exception:
+            return b""
@@ -0,0 +1,61 @@
+import re
+
+
+PAGE_RANGE = re.compile(r'^\s*(\d+)\s*(?:-\s*(\d+)\s*)?$')
+
+
+def read_outline(reader, max_entries=500):
+    """Flatten the PDF's bookmarks into ``[{'title', 'page', 'level'}]`` (pages are 1-based).
+
+    Only the outline tree and its destinations are resolved; no page
+    content is parsed.
+    """
+    entries = []
+
+    def walk(items, level):
+        for item in items:
+            if len(entries) >= max_entries:
+                return
+            if isinstance(item, list):
+                walk(item, level + 1)
+                continue
+            try:
+                page = reader.get_destination_page_number(item) + 1
+            except Exception:
+                page = None
+            entries.append({'title': str(getattr(item, 'title', '') or '').strip(), 'page': page, 'level': level})
+
+    try:
+        walk(reader.outline, 0)
+    except Exception as e:
+        print(f"⚠️ PDF outline could not be read: {e}")
+    return entries
+
+
+def parse_page_range(value, page_count):
+    """Parse ``"7"`` or ``"120-145"`` (1-based, inclusive) into a zero-based ``range``."""
+    match = PAGE_RANGE.match(value or '')
+    if not match:
+        raise ValueError('Page range must look like 12 or 120-145')
+    start = int(match.group(1))
+    end = int(match.group(2) or start)
+    if start < 1 or end < start:
+        raise ValueError('Page range must start at 1 or later and end after it starts')
+    if start > page_count:
+        raise ValueError(f'Page range starts after the last page ({page_count})')
+    return range(start - 1, min(end, page_count))
+
+
+def outline_page_range(outline, title, page_count):
+    """Pages covered by the bookmark named ``title``: from its page up to the next bookmark at the same or a higher level."""
+    wanted = title.strip().lower()
+    for index, entry in enumerate(outline):
+        if entry['title'].lower() != wanted or entry['page'] is None:
+            continue
+        end = page_count
+        for following in outline[index + 1:]:
+            if following['level'] <= entry['level'] and following['page'] is not None and following['page'] > entry['page']:
+                end = following['page'] - 1
+                break
+        return range(entry['page'] - 1, end)
+    raise ValueError(f'Bookmark "{title}" not found in the PDF outline')
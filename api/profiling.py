@@ -0,0 +1,165 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+
+
+PROFILE_HEADER = 'HTTP_X_QUEZAL_PROFILE'
+TOP_FUNCTIONS = 15
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Sample one thread's Python stack from a side thread every ``interval`` seconds.
+
+    Nothing is hooked into the profiled thread itself, so overhead is one
+    ``sys._current_frames()`` walk per tick regardless of how much work the
+    request does.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='quezal-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def summary(self):
+        """Top functions by self samples (leaf frames) and by total samples (anywhere on the stack)."""
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        def rows(counter):
+            return [{'function': label, 'samples': count, 'percent': round(100 * count / max(self.samples, 1), 1)}
+                    for label, count in counter.most_common(TOP_FUNCTIONS)]
+        return {'self': rows(own), 'total': rows(total)}
+
+
+def profile_dir():
+    return str(settings.PROFILER_DIR)
+
+
+def write_profile(record):
+    """Write one profile and drop the oldest files beyond ``PROFILER_MAX_FILES``."""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    name = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{record['duration_ms']:.0f}ms.json"
+    with open(os.path.join(directory, name), 'w') as f:
+        json.dump(record, f)
+    profiles = sorted(entry.name for entry in os.scandir(directory) if entry.name.endswith('.json'))
+    for stale in profiles[:-settings.PROFILER_MAX_FILES] if settings.PROFILER_MAX_FILES > 0 else []:
+        try:
+            os.remove(os.path.join(directory, stale))
+        except FileNotFoundError:
+            pass
+    return name
+
+
+def load_profiles():
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    records = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            continue
+        record['profile_id'] = entry.name
+        records.append(record)
+    return records
+
+
+def header_allowed(request):
+    """The opt-in header is honoured for Django staff sessions or with the configured token."""
+    value = request.META.get(PROFILE_HEADER)
+    if not value:
+        return False
+    token = settings.PROFILER_TOKEN
+    if token and value == token:
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_staff)
+
+
+class SamplingProfilerMiddleware:
+    """Profile a random ``PROFILER_SAMPLE_RATE`` share of requests, plus any allowed opt-in request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        rate = settings.PROFILER_SAMPLE_RATE
+        if rate > 0 and random.random() < rate:
+            return 'sampled'
+        if header_allowed(request):
+            return 'header'
+        return None
+
+    def __call__(self, request):
+        trigger = self.should_profile(request)
+        if not trigger:
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), settings.PROFILER_INTERVAL_MS / 1000)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        duration_ms = (time.perf_counter() - started) * 1000
+        try:
+            write_profile({
+                'method': request.method,
+                'path': request.path,
+                'status_code': response.status_code,
+                'trigger': trigger,
+                'captured_at': datetime.now().isoformat(),
+                'duration_ms': round(duration_ms, 1),
+                'interval_ms': settings.PROFILER_INTERVAL_MS,
+                'samples': sampler.samples,
+                'top_functions': sampler.summary(),
+                # Collapsed stacks, ready for flamegraph.pl / speedscope
+                'stacks': dict(sampler.stacks.most_common(200)),
+            })
+        except Exception as e:
+            print(f"⚠️ Failed to write request profile: {e}")
+        return response
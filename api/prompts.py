@@ -0,0 +1,250 @@
+from functools import lru_cache
+
+from django.conf import settings
+
+
+SOURCE_CHAR_LIMIT = 15000
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+MODE_TYPES = {
+    'mcq': ('mcq',),
+    'true_false': ('true_false',),
+    'fill_blank': ('fill_blank',),
+    'essay': ('essay',),
+    'mixed': ('mcq', 'true_false', 'fill_blank', 'essay'),
+}
+TYPE_RULES = {
+    'mcq': 'mcq: exactly 4 options prefixed "A) ".."D) "; correct_answer is the letter.',
+    'true_false': 'true_false: options ["True","False"]; correct_answer True or False.',
+    'fill_blank': 'fill_blank: mark blanks with _______; options []; correct_answer fills them in order, separated by "; ".',
+    'essay': 'essay: options []; correct_answer lists the key points a full answer covers.',
+}
+
+
+def mode_types(question_types):
+    return MODE_TYPES.get(question_types, MODE_TYPES['mixed'])
+
+
+def build_response_schema(types):
+    """Gemini ``responseSchema`` for a quiz limited to ``types``."""
+    question_fields = ['question', 'type', 'options', 'correct_answer', 'explanation']
+    return {
+        'type': 'OBJECT',
+        'properties': {
+            'questions': {
+                'type': 'ARRAY',
+                'items': {
+                    'type': 'OBJECT',
+                    'properties': {
+                        'question': {'type': 'STRING'},
+                        'type': {'type': 'STRING', 'enum': list(types)},
+                        'options': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+                        'correct_answer': {'type': 'STRING'},
+                        'explanation': {'type': 'STRING'},
+                    },
+                    'required': question_fields,
+                    'propertyOrdering': question_fields,
+                },
+            },
+        },
+        'required': ['questions'],
+    }
+
+
+def build_difficulty_sets_schema(types):
+    """``responseSchema`` for one quiz per difficulty, keyed ``easy``/``medium``/``hard``."""
+    levels = [difficulty.lower() for difficulty in DIFFICULTIES]
+    quiz = build_response_schema(types)
+    return {
+        'type': 'OBJECT',
+        'properties': {level: quiz for level in levels},
+        'required': levels,
+        'propertyOrdering': levels,
+    }
+
+
+class PromptTemplate:
+    """A prompt prefix and generation config compiled once per (version, mode, difficulty)."""
+
+    def __init__(self, version, prefix, generation_config=None, avoid_heading='Do not repeat:'):
+        self.version = version
+        self.prefix = prefix
+        self.generation_config = generation_config
+        self.avoid_heading = avoid_heading
+
+    def render(self, num_questions, source, avoid_questions=None):
+        text = self.prefix.replace('{num_questions}', str(num_questions)) + source[:SOURCE_CHAR_LIMIT]
+        if avoid_questions:
+            text += f"\n{self.avoid_heading}\n" + "\n".join(f"- {q}" for q in avoid_questions)
+        return text
+
+    def payload(self, num_questions, source, avoid_questions=None):
+        payload = {'contents': [{'parts': [{'text': self.render(num_questions, source, avoid_questions)}]}]}
+        if self.generation_config:
+            payload['generationConfig'] = self.generation_config
+        return payload
+
+
+def compile_v2(question_types, difficulty):
+    """Compact prompt; the response shape is enforced by JSON mode + schema, not by examples."""
+    types = mode_types(question_types)
+    rules = ' '.join(TYPE_RULES[t] for t in types)
+    mix = 'Mix all types. ' if len(types) > 1 else ''
+    prefix = (
+        f"Write {{num_questions}} {difficulty} quiz questions from SOURCE. {mix}{rules} "
+        "Test understanding, not recall. Use only SOURCE. One short explanation each.\n"
+        "SOURCE:\n"
+    )
+    config = {'responseMimeType': 'application/json', 'responseSchema': build_response_schema(types)}
+    return PromptTemplate('v2', prefix, config)
+
+
+def compile_difficulty_sets(question_types):
+    """One prompt asking for Easy, Medium and Hard sets so the source is only sent once."""
+    types = mode_types(question_types)
+    rules = ' '.join(TYPE_RULES[t] for t in types)
+    mix = 'Mix all types in each set. ' if len(types) > 1 else ''
+    prefix = (
+        "Write three separate quizzes from SOURCE, {num_questions} questions each: "
+        "easy (key facts and definitions), medium (applying ideas) and hard (analysis across sections). "
+        f"No question may appear in more than one quiz. {mix}{rules} "
+        "Use only SOURCE. One short explanation each.\n"
+        "SOURCE:\n"
+    )
+    config = {'responseMimeType': 'application/json', 'responseSchema': build_difficulty_sets_schema(types)}
+    return PromptTemplate('v2-sets', prefix, config)
+
+
+def compile_v1(question_types, difficulty):
+    """Original free-text mission briefing, kept for comparison benchmarks and rollback."""
+    num_questions = '{num_questions}'
+    pdf_text = '\x00'
+    battle_modes = {
+        "mcq": {
+            "name": "MCQ Assault Mode",
+            "instruction": "Deploy ONLY multiple choice battle questions with exactly 4 tactical options (A, B, C, D).",
+            "example": """
+            {
+                "question": "What is the primary objective in database normalization?",
+                "type": "mcq",
+                "options": ["A) Increase storage space", "B) Eliminate data redundancy", "C) Slow down queries", "D) Increase complexity"],
+                "correct_answer": "B",
+                "explanation": "Database normalization eliminates redundancy and ensures data integrity"
+            }"""
+        },
+        "true_false": {
+            "name": "Binary Strike Mode",
+            "instruction": "Execute ONLY true/false binary battle decisions.",
+            "example": """
+            {
+                "question": "Database locks are always necessary for maintaining consistency.",
+                "type": "true_false",
+                "options": ["True", "False"],
+                "correct_answer": "False",
+                "explanation": "While locks help, there are lock-free methods like optimistic concurrency control"
+            }"""
+        },
+        "fill_blank": {
+            "name": "Stealth Mission Mode",
+            "instruction": "Launch ONLY fill-in-the-blank stealth operations using _______ for tactical blanks.",
+            "example": """
+            {
+                "question": "The _______ protocol ensures that database transactions appear to execute in _______ order.",
+                "type": "fill_blank",
+                "options": [],
+                "correct_answer": "two-phase locking; serial",
+                "explanation": "Two-phase locking protocol ensures serializability by controlling transaction execution order"
+            }"""
+        },
+        "essay": {
+            "name": "Intelligence Report Mode",
+            "instruction": "Generate ONLY comprehensive intelligence report questions requiring detailed analysis.",
+            "example": """
+            {
+                "question": "Analyze the importance of ACID properties in database management systems and their real-world applications.",
+                "type": "essay",
+                "options": [],
+                "correct_answer": "A complete analysis should cover: 1) Atomicity - all-or-nothing transactions 2) Consistency - data integrity rules 3) Isolation - concurrent transaction handling 4) Durability - permanent data storage 5) Real-world examples in banking, e-commerce, etc.",
+                "explanation": "Students should demonstrate understanding of each ACID property and provide practical examples"
+            }"""
+        }
+    }
+    
+    if question_types in battle_modes:
+        mode_config = battle_modes[question_types]
+        battle_instruction = mode_config["instruction"]
+        battle_example = mode_config["example"]
+    else:
+        battle_instruction = "Deploy a STRATEGIC MIX of all battle question types: MCQ Assault, Binary Strike, Stealth Mission, and Intelligence Report."
+        battle_example = "Mix of mcq, true_false, fill_blank, and essay questions"
+    
+    battle_prompt = f"""
+    IQBATTLE MISSION BRIEFING
+    ========================
+    
+    Battle Intelligence Source:
+    {pdf_text}
+    
+    MISSION PARAMETERS:
+    - Deploy exactly {num_questions} battle questions
+    - Difficulty Protocol: {difficulty}
+    - Battle Mode: {battle_instruction}
+    
+    TACTICAL REQUIREMENTS:
+    - Questions must test intellectual combat skills, not just memory recall
+    - Each question needs strategic explanation for battle debriefing
+    - Ensure questions are battlefield-ready and unambiguous
+    - Base all intelligence strictly on provided battle document
+    
+    BATTLE FORMATION (JSON ONLY):
+    {{
+        "questions": [
+            {battle_example}
+        ]
+    }}
+    
+    DEPLOY BATTLE QUESTIONS NOW - JSON RESPONSE ONLY, NO ADDITIONAL COMMUNICATION
+    """
+    
+    # The source sits mid-prompt in v1, so split around a placeholder and append the tail after it
+    head, tail = battle_prompt.split(pdf_text)
+    return LegacyPromptTemplate('v1', head, tail)
+
+
+class LegacyPromptTemplate(PromptTemplate):
+    def __init__(self, version, prefix, suffix):
+        super().__init__(version, prefix, avoid_heading='    DO NOT REPEAT THESE QUESTIONS:')
+        self.suffix = suffix
+
+    def render(self, num_questions, source, avoid_questions=None):
+        count = str(num_questions)
+        text = self.prefix.replace('{num_questions}', count) + source[:SOURCE_CHAR_LIMIT] + self.suffix.replace('{num_questions}', count)
+        if avoid_questions:
+            text += f"\n{self.avoid_heading}\n" + "\n".join(f"    - {q}" for q in avoid_questions)
+        return text
+
+
+PROMPT_COMPILERS = {
+    'v1': compile_v1,
+    'v2': compile_v2,
+}
+
+
+@lru_cache(maxsize=128)
+def get_prompt(question_types, difficulty, version=None):
+    version = version or settings.GEMINI_PROMPT_VERSION
+    return PROMPT_COMPILERS[version](question_types, difficulty)
+
+
+@lru_cache(maxsize=None)
+def get_difficulty_sets_prompt(question_types):
+    # Keyed on the mode only, and unknown modes all compile to 'mixed', so the cache stays tiny
+    if question_types not in MODE_TYPES:
+        question_types = 'mixed'
+    return compile_difficulty_sets(question_types)
+
+
+def precompile_prompts(version=None):
+    for question_types in MODE_TYPES:
+        get_difficulty_sets_prompt(question_types)
+        for difficulty in DIFFICULTIES:
+            get_prompt(question_types, difficulty, version)
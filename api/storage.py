@@ -0,0 +1,289 @@
+import os
+import tempfile
+from datetime import datetime, timezone
+from functools import cached_property, lru_cache
+from io import BytesIO
+
+from django.conf import settings
+
+
+CHUNK_SIZE = 64 * 1024
+
+STORAGE_AREAS = {
+    'uploads': 'battle_uploads',
+    'results': 'battle_results',
+}
+
+
+def clean_name(name):
+    """Blob names are flat file names; reject anything that could escape the area."""
+    if not name or name in ('.', '..') or '/' in name or '\\' in name or '\x00' in name:
+        raise ValueError(f'Invalid blob name: {name!r}')
+    return name
+
+
+def iter_content_chunks(content, chunk_size=CHUNK_SIZE):
+    """Yield bytes from raw bytes/str, a Django UploadedFile or any readable file object."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    if isinstance(content, (bytes, bytearray)):
+        for start in range(0, len(content), chunk_size):
+            yield bytes(content[start:start + chunk_size])
+        return
+    if hasattr(content, 'chunks'):
+        yield from content.chunks(chunk_size)
+        return
+    while True:
+        chunk = content.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+class LocalStorage:
+    """Blob storage on the local filesystem, one directory per area."""
+
+    backend = 'local'
+
+    def __init__(self, root):
+        self.root = str(root)
+
+    def path(self, name):
+        return os.path.join(self.root, clean_name(name))
+
+    def is_ready(self):
+        os.makedirs(self.root, exist_ok=True)
+        return os.path.isdir(self.root)
+
+    def save(self, name, content):
+        """Stream ``content`` to disk and atomically move it into place."""
+        target = self.path(name)
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp_')
+        try:
+            with os.fdopen(fd, 'wb') as destination:
+                for chunk in iter_content_chunks(content):
+                    destination.write(chunk)
+            os.replace(tmp_path, target)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return name
+
+    def open(self, name):
+        path = self.path(name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(name)
+        return open(path, 'rb')
+
+    def read_bytes(self, name):
+        """Read a whole blob; callers that can stream should use ``iter_chunks`` instead."""
+        with self.open(name) as f:
+            return f.read()
+
+    def iter_chunks(self, name, chunk_size=CHUNK_SIZE):
+        with self.open(name) as f:
+            yield from iter_content_chunks(f, chunk_size)
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def delete(self, name):
+        try:
+            os.remove(self.path(name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def listdir(self):
+        if not os.path.isdir(self.root):
+            return []
+        return [entry.name for entry in os.scandir(self.root)
+                if entry.is_file() and not entry.name.startswith('.tmp_')]
+
+    def scan(self):
+        """Yield ``(name, size, modified_time)`` for every blob with a single directory pass."""
+        if not os.path.isdir(self.root):
+            return
+        for entry in os.scandir(self.root):
+            if entry.is_file():
+                stat = entry.stat()
+                yield entry.name, stat.st_size, datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+
+    def size(self, name):
+        return os.path.getsize(self.path(name))
+
+    def modified_time(self, name):
+        return datetime.fromtimestamp(os.path.getmtime(self.path(name)), tz=timezone.utc)
+
+    def url(self, name, download_name=None):
+        # Local blobs are served by the application itself.
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_boto3():
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+    return boto3, Config, ClientError
+
+
+class S3Storage:
+    """Blob storage on any S3-compatible service (AWS S3, MinIO, R2, a local moto server)."""
+
+    backend = 's3'
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None, access_key=None,
+                 secret_key=None, public_base_url=None, presign_expiry=3600):
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.endpoint_url = endpoint_url or None
+        self.region = region or None
+        self.access_key = access_key or None
+        self.secret_key = secret_key or None
+        self.public_base_url = (public_base_url or '').rstrip('/') or None
+        self.presign_expiry = presign_expiry
+
+    @cached_property
+    def client(self):
+        boto3, Config, _ = get_boto3()
+        # Path-style addressing keeps custom endpoints (MinIO, local stand-ins) working without DNS tricks.
+        config = Config(s3={'addressing_style': 'path'}) if self.endpoint_url else None
+        return boto3.client(
+            's3',
+            endpoint_url=self.endpoint_url,
+            region_name=self.region,
+            aws_access_key_id=self.access_key,
+            aws_secret_access_key=self.secret_key,
+            config=config,
+        )
+
+    def key(self, name):
+        name = clean_name(name)
+        return f'{self.prefix}/{name}' if self.prefix else name
+
+    def _is_missing(self, error):
+        _, _, ClientError = get_boto3()
+        return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def is_ready(self):
+        try:
+            self.client.head_bucket(Bucket=self.bucket)
+            return True
+        except Exception as e:
+            print(f"⚠️ S3 bucket {self.bucket} unavailable: {e}")
+            return False
+
+    def save(self, name, content):
+        """Stream ``content`` to S3; boto3 switches to multipart upload for large bodies."""
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        if isinstance(content, (bytes, bytearray)):
+            content = BytesIO(content)
+        elif hasattr(content, 'seek'):
+            content.seek(0)
+        self.client.upload_fileobj(content, self.bucket, self.key(name))
+        return name
+
+    def open(self, name):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.key(name))['Body']
+        except Exception as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(name) from e
+            raise
+
+    def read_bytes(self, name):
+        body = self.open(name)
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def iter_chunks(self, name, chunk_size=CHUNK_SIZE):
+        body = self.open(name)
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    def _head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.key(name))
+        except Exception as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(name) from e
+            raise
+
+    def exists(self, name):
+        try:
+            self._head(name)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete(self, name):
+        if not self.exists(name):
+            return False
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(name))
+        return True
+
+    def scan(self):
+        prefix = f'{self.prefix}/' if self.prefix else ''
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                name = obj['Key'][len(prefix):]
+                if name and '/' not in name:
+                    yield name, obj['Size'], obj['LastModified']
+
+    def listdir(self):
+        return [name for name, _, _ in self.scan()]
+
+    def size(self, name):
+        return self._head(name)['ContentLength']
+
+    def modified_time(self, name):
+        return self._head(name)['LastModified']
+
+    def url(self, name, download_name=None):
+        """Direct URL when the bucket is public, otherwise a short-lived presigned GET."""
+        key = self.key(name)
+        if self.public_base_url:
+            return f'{self.public_base_url}/{key}'
+        params = {'Bucket': self.bucket, 'Key': key}
+        if download_name:
+            params['ResponseContentDisposition'] = f'attachment; filename="{download_name}"'
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=self.presign_expiry)
+
+
+@lru_cache(maxsize=None)
+def get_storage(area):
+    """Return the configured storage backend for ``area`` ('uploads' or 'results')."""
+    folder = STORAGE_AREAS[area]
+    backend = getattr(settings, 'STORAGE_BACKEND', 'local')
+    if backend == 's3':
+        base_prefix = getattr(settings, 'STORAGE_S3_PREFIX', '').strip('/')
+        return S3Storage(
+            bucket=settings.STORAGE_S3_BUCKET,
+            prefix=f'{base_prefix}/{folder}' if base_prefix else folder,
+            endpoint_url=settings.STORAGE_S3_ENDPOINT_URL,
+            region=settings.STORAGE_S3_REGION,
+            access_key=settings.STORAGE_S3_ACCESS_KEY_ID,
+            secret_key=settings.STORAGE_S3_SECRET_ACCESS_KEY,
+            public_base_url=settings.STORAGE_S3_PUBLIC_BASE_URL,
+            presign_expiry=settings.STORAGE_S3_PRESIGN_EXPIRY,
+        )
+    if backend != 'local':
+        raise ValueError(f'Unknown STORAGE_BACKEND: {backend}')
+    return LocalStorage(os.path.join(settings.BASE_DIR, folder))
+
+
+def upload_storage():
+    return get_storage('uploads')
+
+
+def results_storage():
+    return get_storage('results')
@@ -0,0 +1,132 @@
+import gzip
+import json
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .storage import results_storage
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+PAYLOAD_KEY = 'quezal:student_payload:{quiz_id}:{result_filename}'
+ANSWERS_KEY = 'quezal:quiz_answers:{quiz_id}:{result_filename}'
+MIN_COMPRESS_BYTES = 512
+
+
+def load_questions(quiz):
+    data = json.loads(results_storage().read_bytes(quiz.result_filename))
+    return data.get('battle_data', {}).get('questions', [])
+
+
+def build_student_payload(quiz, questions):
+    """Serialise the answer-free quiz once and pre-compress it for every supported encoding."""
+    body = json.dumps({
+        'success': True,
+        'quiz': {
+            'id': quiz.id,
+            'original_filename': quiz.original_filename,
+            'num_questions': quiz.num_questions,
+            'difficulty': quiz.difficulty,
+            'mode': quiz.mode,
+            'created_at': quiz.created_at.isoformat(),
+            'creator_name': quiz.user.name,
+            'questions': [
+                {'number': number, 'question': q.get('question', ''), 'type': q.get('type', 'mcq'), 'options': q.get('options') or []}
+                for number, q in enumerate(questions, start=1)
+            ]
+        }
+    }, separators=(',', ':')).encode('utf-8')
+    encodings = {'identity': body}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        encodings['gzip'] = gzip.compress(body, compresslevel=6, mtime=0)
+        if brotli is not None:
+            encodings['br'] = brotli.compress(body, quality=9)
+    return encodings
+
+
+def cached_student_payload(quiz):
+    key = PAYLOAD_KEY.format(quiz_id=quiz.id, result_filename=quiz.result_filename)
+    encodings = cache.get(key)
+    if encodings is None:
+        encodings = build_student_payload(quiz, load_questions(quiz))
+        cache.set(key, encodings, timeout=settings.STUDENT_PAYLOAD_CACHE_SECONDS)
+    return encodings
+
+
+def cached_answers(quiz):
+    key = ANSWERS_KEY.format(quiz_id=quiz.id, result_filename=quiz.result_filename)
+    answers = cache.get(key)
+    if answers is None:
+        answers = [
+            {'type': q.get('type', 'mcq'), 'correct_answer': q.get('correct_answer', ''), 'explanation': q.get('explanation', '')}
+            for q in load_questions(quiz)
+        ]
+        cache.set(key, answers, timeout=settings.STUDENT_PAYLOAD_CACHE_SECONDS)
+    return answers
+
+
+def compressed_json_response(request, encodings):
+    """Pick the best pre-compressed body for the client's ``Accept-Encoding``."""
+    accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for encoding in ('br', 'gzip'):
+        if encoding in encodings and re.search(rf'\b{encoding}\b', accepted):
+            response = HttpResponse(encodings[encoding], content_type='application/json')
+            response['Content-Encoding'] = encoding
+            break
+    else:
+        response = HttpResponse(encodings['identity'], content_type='application/json')
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def _normalise(value):
+    return ' '.join(str(value or '').lower().split())
+
+
+def grade_answer(answer_key, given):
+    """``True``/``False`` for auto-gradable types, ``None`` for essays."""
+    qtype = answer_key['type']
+    expected = answer_key['correct_answer']
+    if qtype == 'essay':
+        return None
+    if qtype == 'mcq':
+        return _normalise(given)[:1] == _normalise(expected)[:1] and bool(_normalise(given))
+    if qtype == 'fill_blank':
+        return [_normalise(part) for part in str(given or '').split(';')] == \
+               [_normalise(part) for part in str(expected).split(';')]
+    return _normalise(given) == _normalise(expected)
+
+
+def reveal(answer_key, number, given):
+    return {
+        'number': number,
+        'your_answer': given,
+        'correct': grade_answer(answer_key, given),
+        'correct_answer': answer_key['correct_answer'],
+        'explanation': answer_key['explanation'],
+    }
+
+
+def lock_answer(session, quiz_id, number, given):
+    """Keep the first answer checked for each question in this session and return it.
+
+    Checking a question reveals its answer, so a later check (or submit) is
+    graded against the locked answer instead of a corrected one.
+    """
+    locked = session.get('locked_answers', {})
+    answers = locked.setdefault(str(quiz_id), {})
+    if str(number) not in answers:
+        answers[str(number)] = given
+        session['locked_answers'] = locked
+    return answers[str(number)]
+
+
+def locked_answers(session, quiz_id):
+    return session.get('locked_answers', {}).get(str(quiz_id), {})
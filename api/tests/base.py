@@ -0,0 +1,65 @@
+import io
+import json
+import tempfile
+
+from PyPDF2 import PdfReader
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..gemini import RouterResponse
+from ..storage import get_storage
+
+
+class StorageTestCase(TestCase):
+    """Point the local storage backend at a throwaway directory for each test."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(BASE_DIR=self.tmp.name, STORAGE_BACKEND='local')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        get_storage.cache_clear()
+        self.addCleanup(get_storage.cache_clear)
+        cache.clear()
+
+    def login(self, user):
+        session = self.client.session
+        session['user_id'] = user.id
+        session['user_type'] = user.user_type
+        session.save()
+
+
+def true_false(text):
+    return {'question': text, 'type': 'true_false', 'options': ['True', 'False'], 'correct_answer': 'True', 'explanation': ''}
+
+
+def gemini_text_reply(text):
+    body = {'candidates': [{'content': {'parts': [{'text': text}]}}],
+            'usageMetadata': {'promptTokenCount': 10, 'candidatesTokenCount': 5}}
+    return RouterResponse(200, body, '', 'fake#key0', 1, False, 1.0)
+
+
+def gemini_reply(questions):
+    return gemini_text_reply(json.dumps({'questions': questions}))
+
+
+class FakeRouter:
+    routes = ['fake#key0']
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.payloads = []
+
+    def generate(self, payload, on_late=None):
+        self.payloads.append(payload)
+        return self.replies.pop(0)
+
+
+def mcq(text, answer='B'):
+    return {'question': text, 'type': 'mcq', 'options': ['A) one', 'B) two', 'C) three', 'D) four'],
+            'correct_answer': answer, 'explanation': ''}
+
+
+def pdf_text(pdf_bytes):
+    return ''.join(page.extract_text() for page in PdfReader(io.BytesIO(pdf_bytes)).pages)
@@ -0,0 +1,66 @@
+import pickle
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.test import TestCase, override_settings
+
+from ..admission import (COMPARE_AND_DELETE, acquire_generation_slot, release_generation_slot, slot_timeout,
+                         worker_slots)
+
+
+class AdmissionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        worker_slots.cache_clear()
+        self.addCleanup(worker_slots.cache_clear)
+
+    @override_settings(WORKER_THREADS=3, GENERATION_MAX_IN_FLIGHT=8)
+    def test_worker_keeps_a_thread_free_even_with_a_larger_global_cap(self):
+        slots = [acquire_generation_slot(), acquire_generation_slot()]
+        self.assertTrue(all(slots))
+        self.assertIsNone(acquire_generation_slot())
+        release_generation_slot(slots.pop())
+        slots.append(acquire_generation_slot())
+        self.assertIsNotNone(slots[-1])
+        for slot in slots:
+            release_generation_slot(slot)
+
+    @override_settings(WORKER_THREADS=8, GENERATION_MAX_IN_FLIGHT=1)
+    def test_global_cap_rejection_returns_the_worker_slot(self):
+        slot = acquire_generation_slot()
+        for _ in range(10):
+            self.assertIsNone(acquire_generation_slot())
+        release_generation_slot(slot)
+        self.assertIsNotNone(acquire_generation_slot())
+
+    @override_settings(WORKER_THREADS=8, GENERATION_MAX_IN_FLIGHT=1)
+    def test_late_release_of_an_expired_slot_keeps_the_new_owner(self):
+        first = acquire_generation_slot()
+        # The first generation outlives its slot, which is then claimed by a second request
+        cache.delete(first[0])
+        second = acquire_generation_slot()
+        self.assertEqual(second[0], first[0])
+        release_generation_slot(first)
+        self.assertIsNone(acquire_generation_slot())
+        release_generation_slot(second)
+        self.assertIsNotNone(acquire_generation_slot())
+
+    @override_settings(GENERATION_SLOT_TIMEOUT_SECONDS=180, GENERATION_MAX_REASKS=2, GEMINI_TIMEOUT_SECONDS=60)
+    def test_slot_outlives_the_worst_case_generation(self):
+        with mock.patch('api.gemini.get_router', return_value=mock.Mock(routes=['a', 'b'])):
+            self.assertGreaterEqual(slot_timeout(), (1 + 3 * 2) * 2 * 60)
+
+    @override_settings(WORKER_THREADS=8, GENERATION_MAX_IN_FLIGHT=1)
+    def test_redis_release_is_a_compare_and_delete(self):
+        backend = RedisCache('redis://127.0.0.1:1', {})
+        client = mock.Mock()
+        worker_slots().acquire()
+        with mock.patch('api.admission.caches', {'default': backend}), \
+                mock.patch.object(backend._cache, 'get_client', return_value=client):
+            release_generation_slot(('quezal:gen_slot:0', 'abc123'))
+        script, numkeys, key, token = client.eval.call_args.args
+        self.assertEqual(script, COMPARE_AND_DELETE)
+        self.assertEqual((numkeys, key), (1, backend.make_and_validate_key('quezal:gen_slot:0')))
+        self.assertEqual(pickle.loads(token), 'abc123')
+        client.delete.assert_not_called()
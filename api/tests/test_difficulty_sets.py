@@ -0,0 +1,76 @@
+import json
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+
+from ..models import Quiz, User
+from ..parsing import salvage_difficulty_sets
+from ..pdf import generate_quiz_pdf
+from ..prompts import DIFFICULTIES
+from .base import FakeRouter, StorageTestCase, gemini_reply, gemini_text_reply, true_false
+
+
+def level_questions(level, count):
+    return [true_false(f'{level} question {i}') for i in range(count)]
+
+
+def difficulty_sets_text(counts):
+    return json.dumps({level.lower(): {'questions': level_questions(level, count)} for level, count in counts.items()})
+
+
+class SalvageDifficultySetsTests(SimpleTestCase):
+    def test_truncated_reply_keeps_every_level_written_before_the_cut(self):
+        text = difficulty_sets_text({'Easy': 3, 'Medium': 3, 'Hard': 3})
+        truncated = text[:text.index('Hard question 2')]
+        salvaged = salvage_difficulty_sets(truncated, DIFFICULTIES)
+        self.assertEqual({level: len(salvaged[level]['questions']) for level in DIFFICULTIES}, {'Easy': 3, 'Medium': 3, 'Hard': 2})
+        self.assertTrue(all(salvaged[level]['repaired'] for level in DIFFICULTIES))
+
+    def test_missing_level_comes_back_empty(self):
+        salvaged = salvage_difficulty_sets(difficulty_sets_text({'Easy': 2, 'Medium': 2}), DIFFICULTIES)
+        self.assertEqual(salvaged['Hard'], {'questions': [], 'rejected': [], 'repaired': False})
+        self.assertEqual(len(salvaged['Medium']['questions']), 2)
+
+
+class DifficultySetUploadTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create(email='t@example.com', password_hash='x', user_type='teacher')
+        self.login(self.teacher)
+        source = [true_false(f'Source sentence number {i} about database normalisation and indexing.') for i in range(6)]
+        self.pdf = generate_quiz_pdf({'title': 'Source', 'battle_data': {'questions': source}})
+
+    def upload(self, router):
+        with mock.patch('api.views.get_router', return_value=router), override_settings(GENERATION_MAX_REASKS=2):
+            return self.client.post('/upload', {
+                'pdf_file': SimpleUploadedFile('doc.pdf', self.pdf, content_type='application/pdf'),
+                'num_questions': 4, 'difficulty': 'Medium', 'question_types': 'true_false', 'all_difficulties': 'true',
+            })
+
+    def test_only_the_short_level_is_reasked(self):
+        router = FakeRouter([gemini_text_reply(difficulty_sets_text({'Easy': 4, 'Medium': 4, 'Hard': 2})),
+                             gemini_reply([true_false('Extra hard question 0'), true_false('Extra hard question 1')])])
+        response = self.upload(router)
+        self.assertEqual(response.status_code, 200)
+        sets = response.json()['difficulty_sets']
+        self.assertEqual({level: sets[level]['generation_metrics']['regenerations'] for level in DIFFICULTIES},
+                         {'Easy': 0, 'Medium': 0, 'Hard': 1})
+        self.assertEqual(len(sets['Hard']['quiz_data']['questions']), 4)
+        reask = router.payloads[1]['contents'][0]['parts'][0]['text']
+        self.assertIn('Hard', reask)
+        self.assertNotIn('Easy', reask)
+
+    def test_three_linked_quizzes_are_served_by_the_difficulties_endpoint(self):
+        response = self.upload(FakeRouter([gemini_text_reply(difficulty_sets_text({'Easy': 4, 'Medium': 5, 'Hard': 4}))]))
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        quizzes = Quiz.objects.filter(difficulty_group=body['difficulty_group'])
+        self.assertEqual(sorted(quizzes.values_list('difficulty', flat=True)), sorted(DIFFICULTIES))
+        self.assertEqual(len(set(quizzes.values_list('upload_filename', flat=True))), 1)
+        medium = body['difficulty_sets']['Medium']['quiz_id']
+        difficulties = self.client.get(f'/api/my-quizzes/{medium}/difficulties').json()
+        self.assertEqual((difficulties['difficulty'], difficulties['difficulty_group']), ('Medium', body['difficulty_group']))
+        self.assertEqual(list(difficulties['difficulty_sets']), list(DIFFICULTIES))
+        self.assertEqual(difficulties['difficulty_sets']['Hard']['quiz_data']['questions'][0]['question'], 'Hard question 0')
+        self.assertEqual(difficulties['difficulty_sets']['Medium']['num_questions'], 4)
@@ -0,0 +1,60 @@
+import io
+import json
+import zipfile
+
+from ..exports import stream_quiz_library_zip
+from ..models import Quiz, User
+from ..pdf import generate_quiz_pdf
+from ..storage import results_storage
+from .base import StorageTestCase, pdf_text, true_false
+
+
+class LibraryExportTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create(email='t@example.com', password_hash='x', user_type='teacher')
+        self.archives = {}
+        for name in ('first', 'second'):
+            archive = {'title': name, 'battle_data': {'questions': [true_false(f'{name} question')]}}
+            self.archives[name] = json.dumps(archive).encode()
+            results_storage().save(f'{name}.json', self.archives[name])
+        self.first, self.second, self.gone = [
+            Quiz.objects.create(user=self.teacher, result_filename=f'{name}.json', original_filename=f'{name} notes.pdf',
+                                num_questions=1, difficulty='Easy', mode='true_false')
+            for name in ('first', 'second', 'gone')
+        ]
+
+    def export(self, formats):
+        chunks = list(stream_quiz_library_zip(Quiz.objects.order_by('id'), formats, generate_quiz_pdf))
+        self.assertGreater(len(chunks), 1)
+        return zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+    def test_zip_holds_json_pdf_and_a_manifest(self):
+        archive = self.export(('json', 'pdf'))
+        self.assertIsNone(archive.testzip())
+        stem = f'{self.first.id:06d}_first_notes'
+        self.assertEqual(sorted(archive.namelist()), sorted([
+            'manifest.json',
+            f'json/{stem}.json', f'json/{self.second.id:06d}_second_notes.json',
+            f'pdf/{stem}.pdf', f'pdf/{self.second.id:06d}_second_notes.pdf',
+        ]))
+        self.assertEqual(archive.read(f'json/{stem}.json'), self.archives['first'])
+        self.assertIn('first question', pdf_text(archive.read(f'pdf/{stem}.pdf')))
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual(manifest['formats'], ['json', 'pdf'])
+        self.assertEqual([entry['id'] for entry in manifest['quizzes']], [self.first.id, self.second.id])
+        self.assertEqual(manifest['quizzes'][0]['files'], [f'json/{stem}.json', f'pdf/{stem}.pdf'])
+
+    def test_missing_archive_is_listed_in_the_manifest(self):
+        archive = self.export(('json',))
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual(manifest['missing'], [self.gone.id])
+        self.assertFalse(any(name.startswith('pdf/') or '_gone' in name for name in archive.namelist()))
+
+    def test_export_endpoint_streams_the_zip(self):
+        self.login(self.teacher)
+        response = self.client.get('/api/my-quizzes/export', {'format': 'both'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(json.loads(archive.read('manifest.json'))['missing'], [self.gone.id])
@@ -0,0 +1,162 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from ..gemini import GeminiRouter, settle_losing_hedge
+
+
+class StubResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.body = body or {}
+        self.text = json.dumps(self.body)
+
+    def json(self):
+        return self.body
+
+
+class StubSession:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.urls = []
+
+    def post(self, url, **kwargs):
+        self.urls.append(url)
+        return StubResponse(self.status_code)
+
+
+class GeminiRouterTests(TestCase):
+    def test_request_history_is_pruned_without_an_rpm_limit(self):
+        router = GeminiRouter(['k'], ['m'], 'http://gemini.invalid', session=StubSession())
+        route = router.routes[0]
+        route.request_times.extend([time.monotonic() - 120] * 1000)
+        router.generate({})
+        self.assertEqual(len(route.request_times), 1)
+
+
+class StandInGemini(BaseHTTPRequestHandler):
+    """Local Gemini stand-in: the status for each request is chosen by its API key or model."""
+
+    statuses = {}
+    delays = {}
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        model = self.path.split('/models/')[-1].split(':')[0]
+        key = self.headers.get('X-goog-api-key')
+        time.sleep(self.delays.get(key, 0))
+        status = self.statuses.get(key, self.statuses.get(model, 200))
+        body = json.dumps({'candidates': [{'content': {'parts': [{'text': self.path}]}}],
+                           'usageMetadata': {'totalTokenCount': 7}} if status == 200 else {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServerMixin:
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInGemini)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+
+class GeminiFailoverTests(StandInServerMixin, SimpleTestCase):
+    def router(self, statuses, keys=None, models=('flash',)):
+        StandInGemini.statuses = statuses
+        StandInGemini.delays = {}
+        return GeminiRouter(keys or list(statuses), list(models), self.base_url, timeout=5)
+
+    def test_quota_error_fails_over_and_cools_the_route_down(self):
+        router = self.router({'spent': 429, 'fresh': 200})
+        response = router.generate({'contents': []})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.route, 'flash#key1')
+        self.assertEqual(response.attempts, 2)
+        self.assertEqual([route.name for route in router.candidates()], ['flash#key1'])
+
+    def test_server_errors_fail_over_to_the_next_model(self):
+        router = self.router({'flash': 503}, keys=['only'], models=('flash', 'pro'))
+        response = router.generate({'contents': []})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.route, 'pro#key0')
+        self.assertEqual(response.body['candidates'][0]['content']['parts'][0]['text'], '/models/pro:generateContent')
+
+    def test_last_response_is_returned_when_every_route_fails(self):
+        router = self.router({'a': 429, 'b': 503})
+        response = router.generate({'contents': []})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.attempts, 2)
+        self.assertIsNone(router.generate({'contents': []}))
+
+    def test_client_errors_are_not_retried(self):
+        router = self.router({'bad': 400, 'good': 200})
+        response = router.generate({'contents': []})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.attempts, 1)
+
+
+class GeminiHedgeTests(StandInServerMixin, SimpleTestCase):
+    def router(self, statuses, delays):
+        StandInGemini.statuses = statuses
+        StandInGemini.delays = delays
+        router = GeminiRouter(list(statuses), ['flash'], self.base_url, timeout=5, hedge=True, hedge_min_samples=1,
+                              hedge_workers=2)
+        self.addCleanup(router.executor.shutdown)
+        for route in router.routes:
+            route.latencies.append(20.0)
+        return router
+
+    def sending_threads(self, router):
+        threads = []
+        send = router._send
+
+        def record(route, payload):
+            threads.append((route.name, threading.current_thread()))
+            return send(route, payload)
+        router._send = record
+        return threads
+
+    def test_fast_primary_goes_out_on_the_calling_thread_without_a_hedge(self):
+        router = self.router({'fast': 200, 'spare': 200}, {})
+        threads = self.sending_threads(router)
+        response = router.generate({'contents': []})
+        self.assertEqual((response.route, response.hedged), ('flash#key0', False))
+        self.assertEqual(threads, [('flash#key0', threading.current_thread())])
+
+    def test_slow_primary_success_wins_and_the_hedge_is_closed(self):
+        router = self.router({'slow': 200, 'spare': 200}, {'slow': 0.3})
+        threads = self.sending_threads(router)
+        with mock.patch('api.gemini.settle_losing_hedge', wraps=settle_losing_hedge) as settled:
+            response = router.generate({'contents': []})
+            router.executor.shutdown(wait=True)
+        self.assertEqual((response.route, response.hedged), ('flash#key0', True))
+        self.assertEqual(threads[0], ('flash#key0', threading.current_thread()))
+        self.assertEqual(threads[1][0], 'flash#key1')
+        self.assertNotEqual(threads[1][1], threading.current_thread())
+        settled.assert_called_once()
+        self.assertEqual([(attempt['route'], attempt['body']['usageMetadata']) for attempt in response.discarded],
+                         [('flash#key1', {'totalTokenCount': 7})])
+
+    def test_hedge_finishing_after_the_primary_is_reported_late(self):
+        router = self.router({'slow': 200, 'slower': 200}, {'slow': 0.3, 'slower': 0.6})
+        late = []
+        response = router.generate({'contents': []}, on_late=late.append)
+        self.assertEqual((response.route, response.discarded), ('flash#key0', []))
+        router.executor.shutdown(wait=True)
+        self.assertEqual([attempt['route'] for attempt in late], ['flash#key1'])
+
+    def test_hedge_is_used_when_the_slow_primary_fails(self):
+        router = self.router({'slow': 503, 'spare': 200}, {'slow': 0.3})
+        response = router.generate({'contents': []})
+        self.assertEqual((response.status_code, response.route, response.hedged, response.attempts), (200, 'flash#key1', True, 1))
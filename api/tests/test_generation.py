@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from ..models import Quiz, User
+from ..pdf import generate_quiz_pdf
+from .base import FakeRouter, StorageTestCase, gemini_reply, true_false
+
+
+class PartialGenerationTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create(email='t@example.com', password_hash='x', user_type='teacher')
+        self.login(self.teacher)
+        source = [true_false(f'Source sentence number {i} about database normalisation and indexing.') for i in range(6)]
+        self.pdf = generate_quiz_pdf({'title': 'Source', 'battle_data': {'questions': source}})
+
+    def upload(self, replies, num_questions):
+        with mock.patch('api.views.get_router', return_value=FakeRouter(replies)), \
+                override_settings(GENERATION_MAX_REASKS=2):
+            return self.client.post('/upload', {
+                'pdf_file': SimpleUploadedFile('doc.pdf', self.pdf, content_type='application/pdf'),
+                'num_questions': num_questions, 'difficulty': 'Easy', 'question_types': 'true_false',
+            })
+
+    def test_short_quiz_is_stored_with_its_real_count(self):
+        first = [true_false(f'Q{i}') for i in range(4)] + [{'question': 'broken'}]
+        # The re-ask only repeats an accepted question, which ends the re-ask loop
+        response = self.upload([gemini_reply(first), gemini_reply([true_false('Q0')])], 5)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['battle_stats']['total_questions'], 4)
+        self.assertTrue(body['battle_stats']['partial'])
+        self.assertEqual(body['generation_metrics']['regenerations'], 1)
+        self.assertEqual(body['generation_metrics']['rejected_questions'], 2)
+        self.assertEqual(body['generation_metrics']['shortfall'], 1)
+        self.assertEqual(Quiz.objects.get().num_questions, 4)
+
+    def test_quiz_below_the_minimum_is_rejected(self):
+        first = [true_false(f'Q{i}') for i in range(3)]
+        response = self.upload([gemini_reply(first), gemini_reply([true_false('Q0')])], 5)
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('Only 3 valid questions', response.json()['error'])
+        self.assertFalse(Quiz.objects.exists())
+
+    def test_first_reply_without_valid_questions_is_reasked(self):
+        response = self.upload([gemini_reply([{'question': 'broken'}]), gemini_reply([true_false(f'Q{i}') for i in range(4)])], 4)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['battle_stats']['total_questions'], 4)
+        self.assertEqual((body['generation_metrics']['regenerations'], body['generation_metrics']['rejected_questions']), (1, 1))
+
+    def test_reply_without_valid_questions_fails_once_the_reasks_are_spent(self):
+        response = self.upload([gemini_reply([{'question': 'broken'}])] * 3, 4)
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('parsing failed', response.json()['error'])
+        self.assertFalse(Quiz.objects.exists())
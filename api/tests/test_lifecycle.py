@@ -0,0 +1,96 @@
+import json
+import os
+import time
+
+from ..lifecycle import collect_garbage, delete_quizzes
+from ..models import Quiz, User
+from ..storage import results_storage, upload_storage
+from .base import StorageTestCase
+
+DAY = 24 * 60 * 60
+
+
+class LifecycleTestCase(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create(email='t@example.com', password_hash='x', user_type='teacher')
+
+    def blob(self, storage, name, age_seconds=0):
+        storage.save(name, b'{}')
+        modified = time.time() - age_seconds
+        os.utime(storage.path(name), (modified, modified))
+
+    def quiz(self, result_filename, upload_filename=None, difficulty='Easy'):
+        self.blob(results_storage(), result_filename, age_seconds=DAY)
+        return Quiz.objects.create(user=self.teacher, result_filename=result_filename, upload_filename=upload_filename,
+                                   num_questions=4, difficulty=difficulty, mode='true_false')
+
+
+class CollectGarbageTests(LifecycleTestCase):
+    def test_dry_run_reports_but_deletes_nothing(self):
+        self.blob(results_storage(), 'orphan.json', age_seconds=DAY)
+        report = collect_garbage(dry_run=True, grace_seconds=60, retention_days=0)
+        self.assertEqual([(item['name'], item['reason']) for item in report['results']], [('orphan.json', 'orphaned')])
+        self.assertTrue(results_storage().exists('orphan.json'))
+
+    def test_blobs_inside_the_grace_period_are_kept(self):
+        self.blob(results_storage(), 'fresh.json')
+        self.blob(upload_storage(), 'fresh.pdf')
+        self.blob(results_storage(), 'old.json', age_seconds=DAY)
+        report = collect_garbage(dry_run=False, grace_seconds=3600, retention_days=0)
+        self.assertEqual([item['name'] for item in report['results']], ['old.json'])
+        self.assertEqual(report['uploads'], [])
+        self.assertTrue(results_storage().exists('fresh.json'))
+        self.assertFalse(results_storage().exists('old.json'))
+
+    def test_only_stale_temp_files_are_removed(self):
+        self.blob(upload_storage(), '.tmp_stale', age_seconds=DAY)
+        self.blob(upload_storage(), '.tmp_writing')
+        report = collect_garbage(dry_run=False, grace_seconds=3600, retention_days=0)
+        self.assertEqual([(item['name'], item['reason']) for item in report['uploads']], [('.tmp_stale', 'stale_temp')])
+        self.assertEqual(sorted(os.listdir(upload_storage().root)), ['.tmp_writing'])
+
+    def test_referenced_blobs_survive_and_expired_uploads_are_detached(self):
+        kept = self.quiz('kept.json', 'kept.pdf')
+        self.blob(upload_storage(), 'kept.pdf', age_seconds=DAY)
+        expired = self.quiz('expired.json', 'expired.pdf')
+        self.blob(upload_storage(), 'expired.pdf', age_seconds=10 * DAY)
+        report = collect_garbage(dry_run=False, grace_seconds=60, retention_days=7)
+        self.assertEqual(report['results'], [])
+        self.assertEqual([(item['name'], item['reason']) for item in report['uploads']], [('expired.pdf', 'retention_expired')])
+        self.assertTrue(upload_storage().exists('kept.pdf'))
+        self.assertFalse(upload_storage().exists('expired.pdf'))
+        expired.refresh_from_db()
+        kept.refresh_from_db()
+        self.assertIsNone(expired.upload_filename)
+        self.assertEqual(kept.upload_filename, 'kept.pdf')
+        self.assertTrue(results_storage().exists('expired.json'))
+
+
+class DeleteQuizzesTests(LifecycleTestCase):
+    def delete(self, quiz_ids):
+        with self.captureOnCommitCallbacks(execute=True):
+            return delete_quizzes(self.teacher.id, quiz_ids)
+
+    def test_shared_upload_survives_until_its_last_sibling_is_deleted(self):
+        self.blob(upload_storage(), 'shared.pdf')
+        easy, medium, hard = [self.quiz(f'{level}.json', 'shared.pdf', level) for level in ('Easy', 'Medium', 'Hard')]
+        self.delete([easy.id, medium.id])
+        self.assertFalse(results_storage().exists('Easy.json'))
+        self.assertTrue(upload_storage().exists('shared.pdf'))
+        self.delete([hard.id])
+        self.assertFalse(upload_storage().exists('shared.pdf'))
+        self.assertFalse(Quiz.objects.exists())
+
+    def test_bulk_delete_reports_ids_it_did_not_find(self):
+        mine = self.quiz('mine.json')
+        other = User.objects.create(email='o@example.com', password_hash='x', user_type='teacher')
+        theirs = Quiz.objects.create(user=other, result_filename='theirs.json', num_questions=4, difficulty='Easy',
+                                     mode='true_false')
+        self.login(self.teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/my-quizzes/bulk-delete', json.dumps({'quiz_ids': [mine.id, theirs.id, 9999, mine.id]}),
+                                        content_type='application/json')
+        self.assertEqual(response.json(), {'success': True, 'deleted': [mine.id], 'not_found': [theirs.id, 9999]})
+        self.assertTrue(Quiz.objects.filter(id=theirs.id).exists())
+        self.assertFalse(results_storage().exists('mine.json'))
@@ -0,0 +1,49 @@
+import json
+
+from django.test import SimpleTestCase
+
+from ..parsing import extract_question_items, normalize_question
+from .base import mcq
+
+
+class ParsingTests(SimpleTestCase):
+    def test_valid_reply_is_not_marked_repaired(self):
+        items, repaired = extract_question_items(json.dumps({'questions': [mcq('Q1')]}))
+        self.assertEqual(len(items), 1)
+        self.assertFalse(repaired)
+
+    def test_trailing_commas_are_tolerated(self):
+        items, repaired = extract_question_items('{"questions": [{"question": "Q1", "type": "essay",}, ],}')
+        self.assertEqual(items, [{'question': 'Q1', 'type': 'essay'}])
+        self.assertTrue(repaired)
+
+    def test_truncated_array_keeps_complete_items(self):
+        text = json.dumps({'questions': [mcq('Q1'), mcq('Q2')]})
+        items, repaired = extract_question_items(text[:text.rindex('{') + 20])
+        self.assertEqual([item['question'] for item in items], ['Q1'])
+        self.assertTrue(repaired)
+
+    def test_prose_and_code_fences_are_stripped(self):
+        text = 'Here is your quiz:\n```json\n' + json.dumps({'questions': [mcq('Q1')]}) + '\n```\nGood luck!'
+        items, _ = extract_question_items(text)
+        self.assertEqual([item['question'] for item in items], ['Q1'])
+
+    def test_mcq_answer_letter_is_normalised(self):
+        question, reason = normalize_question(mcq('Q1', answer='c) three'))
+        self.assertIsNone(reason)
+        self.assertEqual(question['correct_answer'], 'C')
+
+    def test_mcq_answer_given_as_option_text_maps_to_its_letter(self):
+        question, reason = normalize_question(mcq('Q1', answer='four'))
+        self.assertIsNone(reason)
+        self.assertEqual(question['correct_answer'], 'D')
+
+    def test_mcq_answer_matching_no_option_is_rejected(self):
+        question, reason = normalize_question(mcq('Q1', answer='five'))
+        self.assertIsNone(question)
+        self.assertEqual(reason, 'mcq answer does not match an option')
+
+    def test_mcq_needs_four_options(self):
+        question, reason = normalize_question(dict(mcq('Q1'), options=['A) one', 'B) two']))
+        self.assertIsNone(question)
+        self.assertEqual(reason, 'mcq needs exactly 4 options')
@@ -0,0 +1,20 @@
+from django.test import SimpleTestCase
+
+from ..pdf import generate_quiz_pdf
+from .base import pdf_text
+
+
+class QuizPdfTests(SimpleTestCase):
+    def test_title_markup_is_escaped(self):
+        text = pdf_text(generate_quiz_pdf({'title': 'Notes <b & c>.pdf', 'battle_data': {'questions': []}}))
+        self.assertIn('Notes <b & c>.pdf', text)
+
+    def test_question_fields_are_escaped(self):
+        question = {'question': 'What does the <div> tag do?', 'type': 'mcq',
+                    'options': ['A) List<int>', 'B) <b>bold</b', 'C) a & b', 'D) none'],
+                    'correct_answer': 'B', 'explanation': 'Unclosed <b>bold</b markup & friends'}
+        pdf_bytes = generate_quiz_pdf({'title': 'Tags', 'battle_data': {'questions': [question]}})
+        self.assertTrue(pdf_bytes.startswith(b'%PDF'))
+        text = pdf_text(pdf_bytes)
+        for fragment in ('What does the <div> tag do?', 'List<int>', '<b>bold</b', 'a & b', 'Unclosed <b>bold</b markup & friends'):
+            self.assertIn(fragment, text)
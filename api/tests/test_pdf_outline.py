@@ -0,0 +1,33 @@
+from django.test import SimpleTestCase
+
+from ..pdf_outline import outline_page_range, parse_page_range
+
+
+class PageSelectionTests(SimpleTestCase):
+    outline = [
+        {'title': 'Part I', 'page': 1, 'level': 0},
+        {'title': 'Chapter 1', 'page': 3, 'level': 1},
+        {'title': 'Chapter 2', 'page': 10, 'level': 1},
+        {'title': 'Part II', 'page': 20, 'level': 0},
+    ]
+
+    def test_page_range_is_one_based_and_inclusive(self):
+        self.assertEqual(parse_page_range('3-5', 50), range(2, 5))
+        self.assertEqual(parse_page_range(' 7 ', 50), range(6, 7))
+
+    def test_page_range_is_clamped_to_the_document(self):
+        self.assertEqual(parse_page_range('45-80', 50), range(44, 50))
+
+    def test_invalid_page_ranges_are_rejected(self):
+        for value in ('', 'abc', '0-3', '5-2', '51'):
+            with self.assertRaises(ValueError):
+                parse_page_range(value, 50)
+
+    def test_bookmark_runs_to_the_next_bookmark_at_its_level(self):
+        self.assertEqual(outline_page_range(self.outline, 'chapter 1', 30), range(2, 9))
+        self.assertEqual(outline_page_range(self.outline, 'Part I', 30), range(0, 19))
+        self.assertEqual(outline_page_range(self.outline, 'Part II', 30), range(19, 30))
+
+    def test_unknown_bookmark_is_rejected(self):
+        with self.assertRaises(ValueError):
+            outline_page_range(self.outline, 'Appendix', 30)
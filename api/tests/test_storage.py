@@ -0,0 +1,154 @@
+import os
+import tempfile
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+from urllib.request import urlopen
+from xml.sax.saxutils import escape
+
+from django.test import SimpleTestCase
+
+from ..storage import LocalStorage, S3Storage, clean_name
+
+
+class StandInS3(BaseHTTPRequestHandler):
+    """Local S3 stand-in: path-style requests against one in-memory bucket."""
+
+    protocol_version = 'HTTP/1.1'
+    bucket = 'quezal'
+    objects = {}
+
+    def split(self):
+        url = urlsplit(self.path)
+        bucket, _, key = url.path.lstrip('/').partition('/')
+        return bucket, key, parse_qs(url.query)
+
+    def reply(self, status, body=b'', content_type='application/xml', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def missing(self):
+        self.reply(404, b'<Error><Code>NoSuchKey</Code><Message>missing</Message></Error>')
+
+    def object_headers(self, key):
+        return {'Last-Modified': formatdate(usegmt=True), 'ETag': f'"{len(self.objects[key])}"'}
+
+    def do_PUT(self):
+        bucket, key, _ = self.split()
+        self.objects[key] = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.reply(200, headers={'ETag': '"0"'})
+
+    def do_HEAD(self):
+        bucket, key, _ = self.split()
+        if not key:
+            return self.reply(200 if bucket == self.bucket else 404)
+        if key not in self.objects:
+            return self.reply(404)
+        self.reply(200, self.objects[key], 'application/octet-stream', self.object_headers(key))
+
+    def do_GET(self):
+        bucket, key, query = self.split()
+        if not key:
+            prefix = query.get('prefix', [''])[0]
+            contents = ''.join(
+                f'<Contents><Key>{escape(name)}</Key><Size>{len(data)}</Size>'
+                f'<LastModified>2026-01-01T00:00:00.000Z</LastModified></Contents>'
+                for name, data in sorted(self.objects.items()) if name.startswith(prefix)
+            )
+            body = f'<ListBucketResult><Name>{bucket}</Name><Prefix>{prefix}</Prefix><IsTruncated>false</IsTruncated>{contents}</ListBucketResult>'
+            return self.reply(200, body.encode())
+        if key not in self.objects:
+            return self.missing()
+        self.reply(200, self.objects[key], 'application/octet-stream', self.object_headers(key))
+
+    def do_DELETE(self):
+        bucket, key, _ = self.split()
+        self.objects.pop(key, None)
+        self.reply(204)
+
+    def log_message(self, *args):
+        pass
+
+
+class S3StorageTests(SimpleTestCase):
+    def setUp(self):
+        StandInS3.objects = {}
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInS3)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.storage = S3Storage('quezal', prefix='results', endpoint_url=f'http://127.0.0.1:{self.server.server_address[1]}',
+                                 region='us-east-1', access_key='test', secret_key='test')
+
+    def test_saved_blob_can_be_opened_and_streamed(self):
+        payload = os.urandom(3000)
+        self.assertEqual(self.storage.save('a.json', payload), 'a.json')
+        self.assertIn('results/a.json', StandInS3.objects)
+        self.assertTrue(self.storage.is_ready())
+        with self.storage.open('a.json') as body:
+            self.assertEqual(body.read(), payload)
+        self.assertEqual(b''.join(self.storage.iter_chunks('a.json', chunk_size=1024)), payload)
+        self.assertEqual(self.storage.read_bytes('a.json'), payload)
+        self.assertEqual(self.storage.size('a.json'), 3000)
+
+    def test_exists_delete_and_listing(self):
+        self.storage.save('a.json', 'first')
+        self.storage.save('b.json', 'second')
+        StandInS3.objects['uploads/c.pdf'] = b'other area'
+        self.assertEqual(sorted(self.storage.listdir()), ['a.json', 'b.json'])
+        self.assertTrue(self.storage.exists('a.json'))
+        self.assertTrue(self.storage.delete('a.json'))
+        self.assertFalse(self.storage.exists('a.json'))
+        self.assertFalse(self.storage.delete('a.json'))
+        with self.assertRaises(FileNotFoundError):
+            self.storage.open('a.json')
+
+    def test_url_is_public_or_presigned(self):
+        self.storage.save('a.json', b'{}')
+        url = self.storage.url('a.json', download_name='quiz.json')
+        self.assertIn('Signature=', url)
+        self.assertIn('response-content-disposition=attachment', url)
+        with urlopen(url) as response:
+            self.assertEqual(response.read(), b'{}')
+        public = S3Storage('quezal', prefix='results', public_base_url='https://cdn.example.com/')
+        self.assertEqual(public.url('a.json'), 'https://cdn.example.com/results/a.json')
+
+
+class LocalStorageTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.storage = LocalStorage(tmp.name)
+
+    def test_failed_save_keeps_the_previous_blob_and_no_temp_file(self):
+        self.storage.save('a.json', b'old')
+
+        def broken_chunks(content):
+            yield b'partial'
+            raise OSError('disk full')
+        with mock.patch('api.storage.iter_content_chunks', broken_chunks), self.assertRaises(OSError):
+            self.storage.save('a.json', b'new')
+        self.assertEqual(self.storage.read_bytes('a.json'), b'old')
+        self.assertEqual(os.listdir(self.storage.root), ['a.json'])
+
+    def test_temp_files_are_not_listed(self):
+        self.storage.save('a.json', b'{}')
+        open(os.path.join(self.storage.root, '.tmp_upload'), 'wb').close()
+        self.assertEqual(self.storage.listdir(), ['a.json'])
+        self.assertEqual(self.storage.read_bytes('a.json'), b'{}')
+
+    def test_names_that_escape_the_area_are_rejected(self):
+        for name in ('', '.', '..', '../settings.py', 'a/b.json', '..\\x', 'a\x00.json'):
+            with self.assertRaises(ValueError):
+                clean_name(name)
+            with self.assertRaises(ValueError):
+                self.storage.save(name, b'x')
+        self.assertEqual(clean_name('quiz.json'), 'quiz.json')
@@ -0,0 +1,48 @@
+import json
+
+from ..models import Quiz, User
+from ..storage import results_storage
+from .base import StorageTestCase
+
+
+class AnswerLeakTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create(email='t@example.com', password_hash='x', user_type='teacher')
+        self.student = User.objects.create(email='s@example.com', password_hash='x', user_type='student')
+        archive = {'battle_data': {'questions': [
+            {'question': 'Q?', 'type': 'true_false', 'options': ['True', 'False'],
+             'correct_answer': 'True', 'explanation': 'secret'},
+        ]}}
+        results_storage().save('iqbattle_result_test.json', json.dumps(archive))
+        self.quiz = Quiz.objects.create(user=self.teacher, result_filename='iqbattle_result_test.json',
+                                        original_filename='doc.pdf', num_questions=1, difficulty='Easy', mode='true_false')
+
+    def test_student_payload_has_no_archive_name(self):
+        self.login(self.student)
+        body = json.loads(self.client.get(f'/api/take-quiz/{self.quiz.id}').content)
+        self.assertNotIn('filename', body['quiz'])
+        self.assertNotIn('secret', json.dumps(body))
+
+    def test_download_requires_quiz_owner(self):
+        self.assertEqual(self.client.get('/download/iqbattle_result_test.json').status_code, 401)
+        self.login(self.student)
+        self.assertEqual(self.client.get('/download/iqbattle_result_test.json').status_code, 404)
+        self.login(self.teacher)
+        response = self.client.get('/download/iqbattle_result_test.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'secret', b''.join(response.streaming_content))
+
+    def check(self, answer):
+        return self.client.post(f'/api/take-quiz/{self.quiz.id}/questions/1/check', json.dumps({'answer': answer}),
+                                content_type='application/json').json()['result']
+
+    def test_first_checked_answer_is_locked_for_the_session(self):
+        self.login(self.student)
+        first = self.check('False')
+        self.assertEqual((first['correct'], first['correct_answer'], first['locked']), (False, 'True', False))
+        retry = self.check('True')
+        self.assertEqual((retry['your_answer'], retry['correct'], retry['locked']), ('False', False, True))
+        submitted = self.client.post(f'/api/take-quiz/{self.quiz.id}/submit', json.dumps({'answers': {'1': 'True'}}),
+                                     content_type='application/json').json()
+        self.assertEqual(submitted['score'], 0)
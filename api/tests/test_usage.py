@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from ..models import GenerationRecord, Quiz, User
+from ..pdf import generate_quiz_pdf
+from ..usage import UsageTrace, record_generations
+from .base import FakeRouter, StorageTestCase, gemini_reply, true_false
+
+
+def losing_hedge(tokens):
+    return {'route': 'fake#key1', 'status_code': 200, 'latency_ms': 2.0,
+            'body': {'usageMetadata': {'totalTokenCount': tokens}}}
+
+
+class UsageAccountingTests(StorageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create(email='t@example.com', password_hash='x', user_type='teacher')
+        self.login(self.teacher)
+        source = [true_false(f'Source sentence number {i} about database normalisation and indexing.') for i in range(6)]
+        self.pdf = generate_quiz_pdf({'title': 'Source', 'battle_data': {'questions': source}})
+
+    def upload(self, replies, num_questions):
+        with mock.patch('api.views.get_router', return_value=FakeRouter(replies)), \
+                override_settings(GENERATION_MAX_REASKS=2):
+            return self.client.post('/upload', {
+                'pdf_file': SimpleUploadedFile('doc.pdf', self.pdf, content_type='application/pdf'),
+                'num_questions': num_questions, 'difficulty': 'Easy', 'question_types': 'true_false',
+            })
+
+    def test_losing_hedge_usage_is_recorded_and_linked(self):
+        reply = gemini_reply([true_false(f'Q{i}') for i in range(4)])
+        reply.discarded.append(losing_hedge(40))
+        response = self.upload([reply], 4)
+        self.assertEqual(response.status_code, 200)
+        quiz = Quiz.objects.get()
+        self.assertEqual(sorted(GenerationRecord.objects.filter(quiz=quiz).values_list('total_tokens', flat=True)), [15, 40])
+        self.assertEqual(response.json()['ai_route']['route'], 'fake#key0')
+
+    def test_budget_is_checked_again_before_each_reask(self):
+        self.teacher.daily_token_budget = 30
+        self.teacher.save()
+        record_generations(self.teacher.id, [{'usage': {'prompt_tokens': 10, 'response_tokens': 5, 'total_tokens': 15}}])
+        # 15 already spent plus the 15 of the first reply reaches the budget, so the missing question is not re-asked
+        response = self.upload([gemini_reply([true_false(f'Q{i}') for i in range(4)])], 5)
+        self.assertEqual(response.status_code, 200)
+        metrics = response.json()['generation_metrics']
+        self.assertTrue(metrics['budget_exhausted'])
+        self.assertEqual((metrics['regenerations'], metrics['shortfall']), (0, 1))
+
+    def test_late_call_is_recorded_and_linked_after_the_trace(self):
+        trace = UsageTrace(self.teacher.id)
+        trace.append({'route': 'fake#key0', 'usage': {'prompt_tokens': 10, 'response_tokens': 5, 'total_tokens': 15}})
+        trace.record()
+        quiz = Quiz.objects.create(user=self.teacher, result_filename='r.json', num_questions=1, difficulty='Easy',
+                                   mode='true_false')
+        trace.link(quiz)
+        trace.append_late({'route': 'fake#key1', 'usage': {'prompt_tokens': 30, 'response_tokens': 10, 'total_tokens': 40}})
+        self.assertEqual(len(trace), 1)
+        self.assertEqual(sorted(GenerationRecord.objects.filter(quiz=quiz).values_list('total_tokens', flat=True)), [15, 40])
@@ -0,0 +1,46 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..variants import derive_variant, derive_variants, get_render_pool, render_variant_pdfs
+from .base import mcq, true_false
+
+
+class VariantTests(SimpleTestCase):
+    questions = [mcq(f'Q{i}', answer='ABCD'[i % 4]) for i in range(8)]
+
+    def test_same_seed_and_number_give_the_same_variant(self):
+        self.assertEqual(derive_variant(self.questions, 42, 3, subset_size=5),
+                         derive_variant(self.questions, 42, 3, subset_size=5))
+        self.assertNotEqual(derive_variant(self.questions, 42, 3), derive_variant(self.questions, 42, 4))
+
+    def test_correct_answer_follows_the_shuffled_option(self):
+        variant = derive_variant(self.questions, 7, 1, subset_size=6)
+        self.assertEqual(len(variant['questions']), 6)
+        for question, key in zip(variant['questions'], variant['answer_key']):
+            source = self.questions[key['source_question'] - 1]
+            original = source['options']['ABCD'.index(source['correct_answer'])][3:]
+            chosen = question['options']['ABCD'.index(question['correct_answer'])][3:]
+            self.assertEqual(chosen, original)
+            self.assertEqual(key['correct_answer'], question['correct_answer'])
+
+
+class VariantRenderTests(TestCase):
+    def setUp(self):
+        get_render_pool.cache_clear()
+        self.addCleanup(self.shutdown_pool)
+
+    def shutdown_pool(self):
+        if get_render_pool.cache_info().currsize:
+            get_render_pool().shutdown()
+        get_render_pool.cache_clear()
+
+    @override_settings(VARIANT_RENDER_PROCESSES=1)
+    def test_broken_render_pool_is_replaced(self):
+        # Kill the pool's only child so the cached executor is broken
+        with self.assertRaises(BrokenProcessPool):
+            get_render_pool().submit(os._exit, 1).result()
+        variants = derive_variants([true_false('Q1'), true_false('Q2')], seed=1, count=1)
+        names = [name for name, pdf_bytes in render_variant_pdfs(variants, 'Quiz') if pdf_bytes.startswith(b'%PDF')]
+        self.assertEqual(names, ['variant_01.pdf', 'variant_01_key.pdf'])
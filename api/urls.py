@@ -7,14 +7,24 @@ urlpatterns = [
     path('api/logout', views.api_logout, name='api_logout'),
     path('api/me', views.api_me, name='api_me'),
     path('upload', views.deploy_battle, name='deploy_battle'),
+    path('api/pdf-outline', views.api_pdf_outline, name='api_pdf_outline'),
     path('download/<str:filename>', views.download_battle_results, name='download_battle_results'),
     path('api/my-quizzes', views.api_my_quizzes, name='api_my_quizzes'),
     path('api/my-quizzes/<int:quiz_id>', views.api_delete_my_quiz, name='api_delete_my_quiz'),
+    path('api/my-quizzes/bulk-delete', views.api_bulk_delete_my_quizzes, name='api_bulk_delete_my_quizzes'),
+    path('api/my-quizzes/export', views.api_export_my_quizzes, name='api_export_my_quizzes'),
+    path('api/my-quizzes/<int:quiz_id>/variants', views.api_quiz_variants, name='api_quiz_variants'),
+    path('api/my-quizzes/<int:quiz_id>/difficulties', views.api_quiz_difficulties, name='api_quiz_difficulties'),
+    path('api/my-usage', views.api_my_usage, name='api_my_usage'),
     path('api/profile', views.api_profile, name='api_profile'),
     path('api/change-password', views.api_change_password, name='api_change_password'),
     path('api/battle-stats', views.get_battle_statistics, name='get_battle_statistics'),
     path('api/take-quiz/<int:quiz_id>', views.api_take_quiz, name='api_take_quiz'),
+    path('api/take-quiz/<int:quiz_id>/questions/<int:number>/check', views.api_check_quiz_answer, name='api_check_quiz_answer'),
+    path('api/take-quiz/<int:quiz_id>/submit', views.api_submit_quiz, name='api_submit_quiz'),
     path('api/battle-health', views.battle_system_health, name='battle_system_health'),
+    path('api/admin/profiles', views.api_admin_profiles, name='api_admin_profiles'),
+    path('api/admin/profiles/<str:profile_id>', views.api_admin_profile_detail, name='api_admin_profile_detail'),
     path('', views.battle_arena, name='battle_arena'),
     path('user', views.user_dashboard_page, name='user_dashboard_page'),
 ]
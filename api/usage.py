@@ -0,0 +1,164 @@
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import GenerationRecord, UsageDaily
+
+
+def extract_usage(result):
+    """Token counts from a Gemini ``usageMetadata`` block (all zero when absent)."""
+    usage = (result or {}).get('usageMetadata') or {}
+    prompt_tokens = int(usage.get('promptTokenCount') or 0)
+    response_tokens = int(usage.get('candidatesTokenCount') or 0)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'response_tokens': response_tokens,
+        'total_tokens': int(usage.get('totalTokenCount') or prompt_tokens + response_tokens),
+    }
+
+
+def estimate_cost(prompt_tokens, response_tokens):
+    per_million = Decimal(1_000_000)
+    return (Decimal(prompt_tokens) * Decimal(str(settings.GEMINI_INPUT_COST_PER_MILLION))
+            + Decimal(response_tokens) * Decimal(str(settings.GEMINI_OUTPUT_COST_PER_MILLION))) / per_million
+
+
+def daily_budget(user):
+    if user.daily_token_budget is not None:
+        return user.daily_token_budget
+    return settings.USER_DAILY_TOKEN_BUDGET
+
+
+def tokens_used_today(user_id):
+    row = UsageDaily.objects.filter(user_id=user_id, day=timezone.localdate()).values('total_tokens').first()
+    return row['total_tokens'] if row else 0
+
+
+def check_budget(user):
+    """Return ``(allowed, used_today, budget)``; a budget of 0 means unlimited."""
+    budget = daily_budget(user)
+    used = tokens_used_today(user.id)
+    return (budget <= 0 or used < budget), used, budget
+
+
+def within_budget(user, pending_tokens=0):
+    """Whether ``user`` may spend more tokens, counting ``pending_tokens`` not recorded yet."""
+    allowed, used, budget = check_budget(user)
+    return budget <= 0 or used + pending_tokens < budget
+
+
+def record_generations(user_id, calls):
+    """Store one ``GenerationRecord`` per Gemini call and fold it into today's ``UsageDaily`` row.
+
+    The daily row is bumped with ``F()`` expressions so concurrent workers
+    never lose increments. Returns the ids of the new records.
+    """
+    if not calls:
+        return []
+    records = []
+    for call in calls:
+        usage = call.get('usage') or {}
+        records.append(GenerationRecord(
+            user_id=user_id,
+            route=call.get('route'),
+            prompt_version=call.get('prompt_version'),
+            status_code=call.get('status_code'),
+            prompt_tokens=usage.get('prompt_tokens', 0),
+            response_tokens=usage.get('response_tokens', 0),
+            total_tokens=usage.get('total_tokens', 0),
+            latency_ms=call.get('latency_ms') or 0,
+            cost_usd=estimate_cost(usage.get('prompt_tokens', 0), usage.get('response_tokens', 0)),
+        ))
+    with transaction.atomic():
+        for record in records:
+            record.save()
+        UsageDaily.objects.get_or_create(user_id=user_id, day=timezone.localdate())
+        UsageDaily.objects.filter(user_id=user_id, day=timezone.localdate()).update(
+            generations=F('generations') + len(records),
+            prompt_tokens=F('prompt_tokens') + sum(r.prompt_tokens for r in records),
+            response_tokens=F('response_tokens') + sum(r.response_tokens for r in records),
+            total_tokens=F('total_tokens') + sum(r.total_tokens for r in records),
+            latency_ms=F('latency_ms') + sum(r.latency_ms for r in records),
+            cost_usd=F('cost_usd') + sum((r.cost_usd for r in records), Decimal(0)),
+        )
+    return [record.id for record in records]
+
+
+def link_generations(record_ids, quiz):
+    if record_ids:
+        GenerationRecord.objects.filter(id__in=record_ids).update(quiz=quiz)
+
+
+class UsageTrace(list):
+    """The Gemini calls of one generation, as dicts with a ``usage`` entry.
+
+    Calls that complete after the trace was recorded (a losing hedge that
+    finishes late) are recorded, and linked to the quiz, as they arrive.
+    """
+
+    def __init__(self, user_id):
+        super().__init__()
+        self.user_id = user_id
+        self.lock = threading.Lock()
+        self.recorded_ids = None
+        self.quiz = None
+
+    def tokens(self):
+        with self.lock:
+            return sum(call['usage']['total_tokens'] for call in self)
+
+    def append_late(self, call):
+        with self.lock:
+            if self.recorded_ids is None:
+                self.append(call)
+                return
+            quiz = self.quiz
+        try:
+            link_generations(record_generations(self.user_id, [call]), quiz)
+        except Exception as e:
+            print(f"⚠️ Failed to record late AI usage: {e}")
+
+    def record(self):
+        with self.lock:
+            self.recorded_ids = record_generations(self.user_id, list(self))
+            return self.recorded_ids
+
+    def link(self, quiz):
+        with self.lock:
+            self.quiz = quiz
+            link_generations(self.recorded_ids, quiz)
+
+
+def _window(user_id, days):
+    since = timezone.localdate() - timedelta(days=days - 1)
+    totals = UsageDaily.objects.filter(user_id=user_id, day__gte=since).aggregate(
+        generations=Sum('generations'), prompt_tokens=Sum('prompt_tokens'),
+        response_tokens=Sum('response_tokens'), total_tokens=Sum('total_tokens'), cost_usd=Sum('cost_usd'),
+    )
+    return {key: (float(value) if key == 'cost_usd' else value) if value is not None else 0
+            for key, value in totals.items()}
+
+
+def usage_summary(user):
+    allowed, used, budget = check_budget(user)
+    return {
+        'today': _window(user.id, 1),
+        'last_7_days': _window(user.id, 7),
+        'last_30_days': _window(user.id, 30),
+        'daily_budget': budget,
+        'budget_remaining': max(budget - used, 0) if budget > 0 else None,
+        'budget_exhausted': not allowed,
+    }
+
+
+def quiz_usage(quiz_ids):
+    """Per-quiz totals for ``quiz_ids`` as ``{quiz_id: {...}}``."""
+    rows = (GenerationRecord.objects.filter(quiz_id__in=quiz_ids).values('quiz_id')
+            .annotate(calls=Count('id'), prompt_tokens=Sum('prompt_tokens'), response_tokens=Sum('response_tokens'),
+                      total_tokens=Sum('total_tokens'), latency_ms=Sum('latency_ms'), cost_usd=Sum('cost_usd')))
+    return {row.pop('quiz_id'): dict(row, cost_usd=float(row['cost_usd'] or 0)) for row in rows}
@@ -0,0 +1,105 @@
+import multiprocessing
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from django.conf import settings
+
+from .pdf import generate_quiz_pdf
+
+
+MCQ_LETTERS = ['A', 'B', 'C', 'D']
+OPTION_PREFIX = re.compile(r'^\s*[A-Da-d]\s*[\).:\]]\s*')
+
+
+def permute_mcq(question, rng):
+    """Shuffle an mcq's options, re-letter them and remap ``correct_answer`` to the new letter."""
+    options = [OPTION_PREFIX.sub('', opt) for opt in question.get('options') or []]
+    answer = (question.get('correct_answer') or '').strip()[:1].upper()
+    if len(options) != len(MCQ_LETTERS) or answer not in MCQ_LETTERS:
+        return dict(question)
+    order = list(range(len(options)))
+    rng.shuffle(order)
+    correct_index = MCQ_LETTERS.index(answer)
+    return dict(
+        question,
+        options=[f"{MCQ_LETTERS[pos]}) {options[original]}" for pos, original in enumerate(order)],
+        correct_answer=MCQ_LETTERS[order.index(correct_index)],
+    )
+
+
+def derive_variant(questions, seed, number, subset_size=None):
+    """Build exam variant ``number`` from ``questions``.
+
+    The same (seed, number) always yields the same variant, so variants can
+    be re-derived later instead of stored. Questions are subset, reordered
+    and mcq options permuted; each variant carries its own answer key.
+    """
+    rng = random.Random(f"{seed}:{number}")
+    indexed = list(enumerate(questions))
+    if subset_size and subset_size < len(indexed):
+        indexed = rng.sample(indexed, subset_size)
+    rng.shuffle(indexed)
+
+    variant_questions = []
+    answer_key = []
+    for position, (source_index, question) in enumerate(indexed, start=1):
+        if question.get('type') == 'mcq':
+            question = permute_mcq(question, rng)
+        else:
+            question = dict(question)
+        variant_questions.append(question)
+        answer_key.append({
+            'number': position,
+            'source_question': source_index + 1,
+            'correct_answer': question.get('correct_answer', ''),
+        })
+    return {'variant': number, 'questions': variant_questions, 'answer_key': answer_key}
+
+
+def derive_variants(questions, seed, count, subset_size=None):
+    return [derive_variant(questions, seed, number, subset_size) for number in range(1, count + 1)]
+
+
+def render_variant_pdf(job):
+    """Process-pool entry point: ``job`` is ``(title, questions, include_answers)``."""
+    title, questions, include_answers = job
+    return generate_quiz_pdf({'title': title, 'battle_data': {'questions': questions}}, include_answers=include_answers)
+
+
+@lru_cache(maxsize=None)
+def get_render_pool():
+    # A forkserver preloaded with ReportLab hands out warm children without forking the threaded web worker
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    if 'forkserver' in methods:
+        context.set_forkserver_preload(['api.pdf', 'reportlab.platypus'])
+    return ProcessPoolExecutor(max_workers=settings.VARIANT_RENDER_PROCESSES, mp_context=context)
+
+
+def render_variant_pdfs(variants, quiz_title):
+    """Yield ``(filename, pdf_bytes)`` for every variant's question paper and answer key, in order."""
+    jobs = []
+    names = []
+    for variant in variants:
+        label = f"{quiz_title} - Variant {variant['variant']}"
+        jobs.append((label, variant['questions'], False))
+        names.append(f"variant_{variant['variant']:02d}.pdf")
+        jobs.append((f"{label} - Answer Key", variant['questions'], True))
+        names.append(f"variant_{variant['variant']:02d}_key.pdf")
+    done = 0
+    for attempt in range(2):
+        pool = get_render_pool()
+        try:
+            for pdf_bytes in pool.map(render_variant_pdf, jobs[done:], chunksize=2):
+                yield names[done], pdf_bytes
+                done += 1
+            return
+        except BrokenProcessPool:
+            # A dead child (OOM, ReportLab crash) breaks the pool for good, so replace it and retry what is left once
+            get_render_pool.cache_clear()
+            pool.shutdown(wait=False, cancel_futures=True)
+            if attempt:
+                raise
@@ -3,26 +3,43 @@ import json
 from datetime import datetime
 import hashlib
 import secrets
+from functools import lru_cache
 from io import BytesIO
-import PyPDF2
-import requests
-from dotenv import load_dotenv
 
-from django.http import JsonResponse, FileResponse, Http404
+from django.http import JsonResponse, FileResponse, Http404, HttpResponseRedirect, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
 from django.shortcuts import render
+from django.db.models import Avg, Sum
 from .models import User, Quiz
+from .pdf import generate_quiz_pdf
+from .storage import upload_storage, results_storage
+from .lifecycle import delete_quizzes
+from .gemini import get_router
+from .exports import EXPORT_FORMATS, stream_quiz_library_zip, stream_variant_zip
+from .variants import derive_variants
+from .profiling import header_allowed, load_profiles
+from .pdf_outline import outline_page_range, parse_page_range, read_outline
+from .student import (cached_answers, cached_student_payload, compressed_json_response, load_questions, lock_answer,
+                      locked_answers, reveal)
+from .usage import UsageTrace, check_budget, extract_usage, quiz_usage, usage_summary, within_budget
+from .admission import generation_admission, in_flight_generations
+from .parsing import QUESTION_TYPES, salvage_difficulty_sets, salvage_questions
+from .prompts import DIFFICULTIES, SOURCE_CHAR_LIMIT, get_difficulty_sets_prompt, get_prompt
 
-# Load environment variables
-load_dotenv()
+MIN_BATTLE_QUESTIONS = 4
 
-# Configure battle arsenal folders
-UPLOAD_FOLDER = os.path.join(settings.BASE_DIR, 'battle_uploads')
-RESULTS_FOLDER = os.path.join(settings.BASE_DIR, 'battle_results')
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(RESULTS_FOLDER, exist_ok=True)
+# Heavy modules are imported on first use and cached, keeping cold start cheap.
+@lru_cache(maxsize=None)
+def get_pdf_reader_module():
+    import PyPDF2
+    return PyPDF2
+
+@lru_cache(maxsize=None)
+def get_http_client():
+    import requests
+    return requests
 
 def hash_password(password: str) -> str:
     salt = os.getenv('PASSWORD_SALT', 'quezal_salt')
@@ -58,26 +75,56 @@ def extract_generated_text(result):
         print(f"🔍 Full AI response: {result}")
         return None
 
-def extract_text_from_pdf(pdf_path):
+def extract_text_from_reader(pdf_reader, pages=None, max_chars=None):
+    """Extract text from ``pages`` only (all by default), stopping once ``max_chars`` is reached.
+
+    PdfReader resolves pages lazily, so pages outside the selection are never parsed.
+    """
+    try:
+        parts = []
+        length = 0
+        for page_num in (pages if pages is not None else range(len(pdf_reader.pages))):
+            page_text = (pdf_reader.pages[page_num].extract_text() or '') + "\n"
+            parts.append(page_text)
+            length += len(page_text)
+            if max_chars and length >= max_chars:
+                break
+        return "".join(parts).strip()
+    except Exception as e:
+        print(f"❌ PDF intelligence extraction failed: {e}")
+        return None
+
+def extract_text_from_pdf(pdf_source, pages=None, max_chars=None):
+    """Extract text from a PDF given a filesystem path or a readable binary stream."""
     try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text() + "\n"
-            return text.strip()
+        pdf_reader = get_pdf_reader_module().PdfReader(pdf_source)
     except Exception as e:
         print(f"❌ PDF intelligence extraction failed: {e}")
         return None
+    return extract_text_from_reader(pdf_reader, pages, max_chars)
+
+def select_pdf_pages(pdf_reader, page_range=None, outline_title=None):
+    """Zero-based pages chosen by a ``page_range`` string or a bookmark title; ``None`` means every page."""
+    page_count = len(pdf_reader.pages)
+    if page_range:
+        return parse_page_range(page_range, page_count)
+    if outline_title:
+        return outline_page_range(read_outline(pdf_reader), outline_title, page_count)
+    return None
 
-def generate_battle_questions(pdf_text, num_questions=8, difficulty="Medium", question_types="mixed"):
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
+def generate_battle_questions(pdf_text, num_questions=8, difficulty="Medium", question_types="mixed", trace=None,
+                              avoid_questions=None, seen=None):
+    """Ask Gemini for a quiz and salvage every valid question from the reply.
+
+    When ``trace`` is a list, one dict per Gemini call is appended to it.
+    ``avoid_questions`` are listed in the prompt so a re-ask asks for new ones.
+    """
+    router = get_router()
+    if not router.routes:
         print("❌ No AI battle credentials found! Check your .env battle config")
         return None
         
-    print(f"✅ AI Battle Commander authenticated: {api_key[:10]}...")
+    print(f"✅ AI Battle Commander authenticated: {len(router.routes)} routes available")
     print(f"⚔️ Battle mode: {question_types}")
     print(f"🎯 Difficulty protocol: {difficulty}")
     
@@ -85,185 +132,206 @@ def generate_battle_questions(pdf_text, num_questions=8, difficulty="Medium", qu
         print("❌ Insufficient PDF text for question generation")
         return None
     
-    # AI Battle Command Center endpoint - Using Gemini Flash Latest for broader quota availability
-    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-flash-latest:generateContent"
-    
-    battle_modes = {
-        "mcq": {
-            "name": "MCQ Assault Mode",
-            "instruction": "Deploy ONLY multiple choice battle questions with exactly 4 tactical options (A, B, C, D).",
-            "example": """
-            {
-                "question": "What is the primary objective in database normalization?",
-                "type": "mcq",
-                "options": ["A) Increase storage space", "B) Eliminate data redundancy", "C) Slow down queries", "D) Increase complexity"],
-                "correct_answer": "B",
-                "explanation": "Database normalization eliminates redundancy and ensures data integrity"
-            }"""
-        },
-        "true_false": {
-            "name": "Binary Strike Mode",
-            "instruction": "Execute ONLY true/false binary battle decisions.",
-            "example": """
-            {
-                "question": "Database locks are always necessary for maintaining consistency.",
-                "type": "true_false",
-                "options": ["True", "False"],
-                "correct_answer": "False",
-                "explanation": "While locks help, there are lock-free methods like optimistic concurrency control"
-            }"""
-        },
-        "fill_blank": {
-            "name": "Stealth Mission Mode",
-            "instruction": "Launch ONLY fill-in-the-blank stealth operations using _______ for tactical blanks.",
-            "example": """
-            {
-                "question": "The _______ protocol ensures that database transactions appear to execute in _______ order.",
-                "type": "fill_blank",
-                "options": [],
-                "correct_answer": "two-phase locking; serial",
-                "explanation": "Two-phase locking protocol ensures serializability by controlling transaction execution order"
-            }"""
-        },
-        "essay": {
-            "name": "Intelligence Report Mode",
-            "instruction": "Generate ONLY comprehensive intelligence report questions requiring detailed analysis.",
-            "example": """
-            {
-                "question": "Analyze the importance of ACID properties in database management systems and their real-world applications.",
-                "type": "essay",
-                "options": [],
-                "correct_answer": "A complete analysis should cover: 1) Atomicity - all-or-nothing transactions 2) Consistency - data integrity rules 3) Isolation - concurrent transaction handling 4) Durability - permanent data storage 5) Real-world examples in banking, e-commerce, etc.",
-                "explanation": "Students should demonstrate understanding of each ACID property and provide practical examples"
-            }"""
-        }
-    }
-    
-    if question_types in battle_modes:
-        mode_config = battle_modes[question_types]
-        battle_instruction = mode_config["instruction"]
-        battle_example = mode_config["example"]
-    else:
-        battle_instruction = "Deploy a STRATEGIC MIX of all battle question types: MCQ Assault, Binary Strike, Stealth Mission, and Intelligence Report."
-        battle_example = "Mix of mcq, true_false, fill_blank, and essay questions"
-    
-    battle_prompt = f"""
-    IQBATTLE MISSION BRIEFING
-    ========================
-    
-    Battle Intelligence Source:
-    {pdf_text[:15000]}
-    
-    MISSION PARAMETERS:
-    - Deploy exactly {num_questions} battle questions
-    - Difficulty Protocol: {difficulty}
-    - Battle Mode: {battle_instruction}
-    
-    TACTICAL REQUIREMENTS:
-    - Questions must test intellectual combat skills, not just memory recall
-    - Each question needs strategic explanation for battle debriefing
-    - Ensure questions are battlefield-ready and unambiguous
-    - Base all intelligence strictly on provided battle document
-    
-    BATTLE FORMATION (JSON ONLY):
-    {{
-        "questions": [
-            {battle_example}
-        ]
-    }}
-    
-    DEPLOY BATTLE QUESTIONS NOW - JSON RESPONSE ONLY, NO ADDITIONAL COMMUNICATION
-    """
-    
-    payload = {
-        "contents": [{
-            "parts": [{
-                "text": battle_prompt
-            }]
-        }]
-    }
-    
-    headers = {
-        "Content-Type": "application/json",
-        "X-goog-api-key": api_key
-    }
+    prompt = get_prompt(question_types, difficulty)
+    payload = prompt.payload(num_questions, pdf_text, avoid_questions)
     
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code == 200:
-            result = response.json()
-            generated_text = extract_generated_text(result)
-            if not generated_text:
-                return {"error": "AI Battle Commander failed to generate intelligence"}
-            
-            generated_text = generated_text.strip()
-            if generated_text.startswith("```"):
-                if generated_text.startswith("```json"):
-                    generated_text = generated_text[7:]
-                else:
-                    generated_text = generated_text[3:]
-            if generated_text.endswith("```"):
-                generated_text = generated_text[:-3]
+        generated_text, error = ask_battle_commander(router, prompt, payload, trace)
+        if error:
+            return error
             
-            try:
-                battle_data = json.loads(generated_text)
-                return battle_data
-            except json.JSONDecodeError as e:
-                return {"error": "Battle data parsing failed. The AI response was not in a valid format."}
-        elif response.status_code == 429:
-            return {"error": "Google AI Quota Exceeded. Please wait 60 seconds and try again."}
-        else:
-            return {"error": f"AI Battle Command Error ({response.status_code}): {response.text[:200]}"}
+        allowed_types = (question_types,) if question_types in QUESTION_TYPES else None
+        battle_data = salvage_questions(generated_text, allowed_types, seen)
+        if battle_data['rejected'] or battle_data['repaired']:
+            print(f"🩹 Salvaged {len(battle_data['questions'])} questions, rejected {len(battle_data['rejected'])}: {battle_data['rejected']}")
+        if not battle_data['questions']:
+            # Keep the rejection counts so a re-ask that only produced duplicates still shows up in the metrics
+            return dict(battle_data, error="Battle data parsing failed. The AI response was not in a valid format.")
+        return battle_data
             
     except Exception as e:
         return None
 
-def generate_quiz_pdf(archive: dict) -> bytes:
+def discarded_call(attempt, prompt):
+    """Trace entry for a billed attempt whose reply was not used (a losing hedge)."""
+    return {
+        'route': attempt['route'],
+        'attempts': 1,
+        'hedged': True,
+        'latency_ms': attempt['latency_ms'],
+        'status_code': attempt['status_code'],
+        'prompt_version': prompt.version,
+        'usage': extract_usage(attempt['body']),
+        'discarded': True
+    }
+
+def ask_battle_commander(router, prompt, payload, trace=None):
+    """Send one prompt through the router; returns ``(generated_text, None)`` or ``(None, error_dict)``.
+
+    Every billed attempt goes into ``trace``, including hedges that lost,
+    even when they finish after this returns.
+    """
+    on_late = None
+    if trace is not None:
+        add_late = getattr(trace, 'append_late', trace.append)
+        on_late = lambda attempt: add_late(discarded_call(attempt, prompt))
+    response = router.generate(payload, on_late=on_late)
+    if response is None:
+        return None, {"error": "Google AI Quota Exceeded. Please wait 60 seconds and try again."}
+    if trace is not None:
+        trace.extend(discarded_call(attempt, prompt) for attempt in response.discarded)
+        trace.append(dict(response.describe(), prompt_version=prompt.version, usage=extract_usage(response.body)))
+    if response.status_code == 200:
+        generated_text = extract_generated_text(response.body or {})
+        if not generated_text:
+            return None, {"error": "AI Battle Commander failed to generate intelligence"}
+        return generated_text, None
+    elif response.status_code == 429:
+        return None, {"error": "Google AI Quota Exceeded. Please wait 60 seconds and try again."}
+    else:
+        return None, {"error": f"AI Battle Command Error ({response.status_code}): {response.text[:200]}"}
+
+def top_up_questions(pdf_text, questions, num_questions, difficulty, question_types, metrics, trace=None, seen=None,
+                     can_reask=None):
+    """Re-ask for the questions still missing from ``questions`` (extended in place), at most ``GENERATION_MAX_REASKS`` times.
+
+    ``can_reask`` is checked before every re-ask, so a generation stops once the user's token budget is spent.
+    """
+    reasks = 0
+    while len(questions) < num_questions and reasks < settings.GENERATION_MAX_REASKS:
+        if can_reask is not None and not can_reask():
+            print("💸 Token budget spent, not re-asking for the missing questions")
+            metrics['budget_exhausted'] = True
+            break
+        missing = num_questions - len(questions)
+        reasks += 1
+        metrics['regenerations'] += 1
+        print(f"🔁 Re-asking AI Battle Commander for {missing} missing {difficulty} questions")
+        extra = generate_battle_questions(pdf_text, missing, difficulty, question_types, trace=trace,
+                                          avoid_questions=[q['question'] for q in questions], seen=seen)
+        if extra:
+            metrics['rejected_questions'] += len(extra.get('rejected', []))
+            metrics['repaired_responses'] += int(extra.get('repaired', False))
+        if not extra or 'error' in extra:
+            break
+        questions.extend(extra['questions'][:missing])
+    metrics['shortfall'] = max(num_questions - len(questions), 0)
+    return questions
+
+def generate_complete_battle(pdf_text, num_questions, difficulty, question_types, trace=None, can_reask=None):
+    """Generate a quiz, then re-ask only for the questions that failed validation.
+
+    A first reply without a single valid question is re-asked like any other
+    shortfall. Returns ``(battle_data, metrics)``; ``battle_data`` is an error
+    dict when no call produced anything usable.
+    """
+    seen = set()
+    metrics = {'regenerations': 0, 'rejected_questions': 0, 'repaired_responses': 0, 'shortfall': num_questions}
+    battle_data = generate_battle_questions(pdf_text, num_questions, difficulty, question_types, trace=trace, seen=seen)
+    if battle_data:
+        metrics['rejected_questions'] += len(battle_data.get('rejected', []))
+        metrics['repaired_responses'] += int(battle_data.get('repaired', False))
+    # Only a parsed reply carries 'questions'; quota and transport errors are not worth re-asking
+    if not battle_data or 'questions' not in battle_data:
+        return battle_data, metrics
+        
+    questions = battle_data['questions'][:num_questions]
+    top_up_questions(pdf_text, questions, num_questions, difficulty, question_types, metrics, trace=trace, seen=seen,
+                     can_reask=can_reask)
+    if not questions:
+        return {'error': battle_data['error']}, metrics
+    return {'questions': questions}, metrics
+
+def generate_difficulty_sets(pdf_text, num_questions, question_types, trace=None, can_reask=None):
+    """Generate Easy, Medium and Hard quizzes from one Gemini call carrying the source once.
+
+    Only a level that comes back short is re-asked on its own. Returns
+    ``(sets, metrics)`` keyed by difficulty; ``sets`` is an error dict when
+    the shared call produced nothing usable.
+    """
+    router = get_router()
+    if not router.routes:
+        print("❌ No AI battle credentials found! Check your .env battle config")
+        return None, {}
+    if not pdf_text or len(pdf_text.strip()) < 100:
+        print("❌ Insufficient PDF text for question generation")
+        return None, {}
+        
+    print(f"⚔️ Battle mode: {question_types}")
+    print(f"🎯 Difficulty protocol: {', '.join(DIFFICULTIES)} in one call")
+    prompt = get_difficulty_sets_prompt(question_types)
     try:
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.units import inch
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
-        
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, leftMargin=0.75*inch, rightMargin=0.75*inch, topMargin=0.75*inch, bottomMargin=0.75*inch)
-        styles = getSampleStyleSheet()
-        story = []
-
-        title = archive.get('battle_document', 'Quezal Quiz')
-        story.append(Paragraph(f"<b>Quezal Quiz</b>", styles['Title']))
-        story.append(Spacer(1, 0.2*inch))
-
-        battle_data = archive.get('battle_data', {})
-        questions = battle_data.get('questions', [])
-        for idx, q in enumerate(questions, start=1):
-            story.append(Paragraph(f"<b>Q{idx}.</b> {q.get('question','')}", styles['Heading4']))
-            opts = q.get('options') or []
-            if opts:
-                for opt in opts:
-                    story.append(Paragraph(f"- {opt}", styles['Normal']))
-            story.append(Spacer(1, 0.1*inch))
-            story.append(Paragraph(f"<b>Answer:</b> {q.get('correct_answer','')}", styles['Normal']))
-            story.append(Paragraph(f"<b>Explanation:</b> {q.get('explanation','')}", styles['Normal']))
-            story.append(Spacer(1, 0.2*inch))
-
-        doc.build(story)
-        pdf = buffer.getvalue()
-        buffer.close()
-        return pdf
+        generated_text, error = ask_battle_commander(router, prompt, prompt.payload(num_questions, pdf_text), trace)
     except Exception as e:
-        try:
-            from reportlab.lib.pagesizes import letter
-            from reportlab.pdfgen import canvas
-            buf = BytesIO()
-            c = canvas.Canvas(buf, pagesize=letter)
-            c.drawString(72, 750, "Quezal Quiz")
-            c.drawString(72, 730, f"Error generating PDF: {e}")
-            c.save()
-            return buf.getvalue()
-        except Exception:
-            return b""
+        return None, {}
+    if error:
+        return error, {}
+        
+    seen = set()
+    allowed_types = (question_types,) if question_types in QUESTION_TYPES else None
+    salvaged = salvage_difficulty_sets(generated_text, DIFFICULTIES, allowed_types, seen)
+    if not any(level['questions'] for level in salvaged.values()):
+        return {"error": "Battle data parsing failed. The AI response was not in a valid format."}, {}
+        
+    sets, metrics = {}, {}
+    for difficulty, battle_data in salvaged.items():
+        if battle_data['rejected'] or battle_data['repaired']:
+            print(f"🩹 {difficulty}: salvaged {len(battle_data['questions'])} questions, rejected {len(battle_data['rejected'])}: {battle_data['rejected']}")
+        level_metrics = {
+            'regenerations': 0,
+            'rejected_questions': len(battle_data['rejected']),
+            'repaired_responses': int(battle_data['repaired'])
+        }
+        questions = battle_data['questions'][:num_questions]
+        top_up_questions(pdf_text, questions, num_questions, difficulty, question_types, level_metrics, trace=trace, seen=seen,
+                         can_reask=can_reask)
+        if questions:
+            sets[difficulty] = {'questions': questions}
+            metrics[difficulty] = level_metrics
+    return sets, metrics
+
+def question_formation_of(battle_questions):
+    question_formation = {}
+    for q in battle_questions.get('questions', []):
+        qtype = q.get('type', 'mcq')
+        question_formation[qtype] = question_formation.get(qtype, 0) + 1
+    return question_formation
+
+def archive_battle(user, battle_file, battle_filename, battle_questions, battle_parameters, ai_route, generation_metrics,
+                   difficulty_group=None):
+    """Write one result archive and its ``Quiz`` row; returns ``(result_filename, question_formation, quiz)``."""
+    battle_result_filename = f"iqbattle_result_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(4)}.json"
+    question_formation = question_formation_of(battle_questions)
+    battle_archive = {
+        'battle_document': battle_filename,
+        'deployment_timestamp': datetime.now().isoformat(),
+        'battle_parameters': dict(battle_parameters, question_formation=question_formation),
+        'battle_system': 'IQBattle_v2.0_AI_Enhanced',
+        'battle_commander': 'Google_AI_Gemini_1.5_Flash',
+        'ai_route': ai_route,
+        'generation_metrics': generation_metrics,
+        'difficulty_group': difficulty_group,
+        'battle_data': battle_questions
+    }
+    
+    results_storage().save(battle_result_filename, json.dumps(battle_archive, indent=2))
+        
+    quiz = None
+    try:
+        quiz = Quiz.objects.create(
+            user=user,
+            result_filename=battle_result_filename,
+            original_filename=battle_file.name,
+            upload_filename=battle_filename,
+            num_questions=battle_parameters['num_questions'],
+            difficulty=battle_parameters['difficulty_protocol'],
+            mode=battle_parameters['battle_mode'],
+            regenerations=generation_metrics['regenerations'],
+            difficulty_group=difficulty_group
+        )
+    except Exception as e:
+        print(f"⚠️ Failed to persist quiz metadata: {e}")
+    return battle_result_filename, question_formation, quiz
 
 @require_http_methods(["GET"])
 def battle_arena(request):
@@ -358,12 +426,26 @@ def api_me(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@generation_admission
 def deploy_battle(request):
     try:
         user_id = get_current_user_id(request)
         if not user_id:
             return JsonResponse({'error': 'Authentication required'}, status=401)
         
+        try:
+            user = User.objects.get(id=user_id)
+        except User.DoesNotExist:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+            
+        # Enforce the token budget before the upload is parsed or Gemini is called
+        budget_left, tokens_used, token_budget = check_budget(user)
+        if not budget_left:
+            return JsonResponse({
+                'error': f'Daily AI token budget exhausted ({tokens_used}/{token_budget} tokens). Please try again tomorrow.',
+                'battle_status': 'BUDGET_EXHAUSTED'
+            }, status=429)
+        
         if 'pdf_file' not in request.FILES:
             return JsonResponse({'error': 'No PDF battle document uploaded'}, status=400)
             
@@ -374,88 +456,123 @@ def deploy_battle(request):
         num_questions = int(request.POST.get('num_questions', 8))
         difficulty = request.POST.get('difficulty', 'Medium')
         question_types = request.POST.get('question_types', 'mixed')
+        all_difficulties = (request.POST.get('all_difficulties') or '').strip().lower() in ('1', 'true', 'yes', 'on')
+        
+        page_range = (request.POST.get('page_range') or '').strip()
+        outline_title = (request.POST.get('outline_title') or '').strip()
         
-        if num_questions < 4:
-            return JsonResponse({'error': 'Minimum 4 questions required for IQBattle deployment'}, status=400)
+        if num_questions < MIN_BATTLE_QUESTIONS:
+            return JsonResponse({'error': f'Minimum {MIN_BATTLE_QUESTIONS} questions required for IQBattle deployment'}, status=400)
             
-        battle_filename = f"battle_document_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        battle_path = os.path.join(UPLOAD_FOLDER, battle_filename)
-        
-        with open(battle_path, 'wb+') as destination:
-            for chunk in battle_file.chunks():
-                destination.write(chunk)
-                
-        battle_intelligence = extract_text_from_pdf(battle_path)
+        try:
+            pdf_reader = get_pdf_reader_module().PdfReader(battle_file)
+            selected_pages = select_pdf_pages(pdf_reader, page_range, outline_title)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except Exception as e:
+            print(f"❌ PDF intelligence extraction failed: {e}")
+            return JsonResponse({'error': 'Failed to extract battle intelligence from PDF'}, status=400)
+            
+        # Random suffix keeps names unique when several instances share one bucket
+        battle_filename = f"battle_document_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(4)}.pdf"
+        upload_storage().save(battle_filename, battle_file)
+        
+        # Only the selected pages are parsed, and only until the prompt's source budget is filled
+        battle_intelligence = extract_text_from_reader(pdf_reader, selected_pages, SOURCE_CHAR_LIMIT)
         if not battle_intelligence:
             return JsonResponse({'error': 'Failed to extract battle intelligence from PDF'}, status=400)
             
-        battle_questions = generate_battle_questions(battle_intelligence, num_questions, difficulty, question_types)
+        ai_calls = UsageTrace(user_id)
+        # Re-asks count this generation's calls, which are only recorded once it finishes
+        can_reask = lambda: within_budget(user, ai_calls.tokens())
+        if all_difficulties:
+            battle_sets, metrics_by_difficulty = generate_difficulty_sets(battle_intelligence, num_questions, question_types,
+                                                                          trace=ai_calls, can_reask=can_reask)
+        else:
+            battle_questions, generation_metrics = generate_complete_battle(battle_intelligence, num_questions, difficulty, question_types,
+                                                                            trace=ai_calls, can_reask=can_reask)
+            battle_sets = {difficulty: battle_questions} if battle_questions and 'error' not in battle_questions else battle_questions
+            metrics_by_difficulty = {difficulty: generation_metrics}
+        ai_route = next((call for call in reversed(ai_calls) if not call.get('discarded')), None)
+        try:
+            ai_calls.record()
+        except Exception as e:
+            print(f"⚠️ Failed to record AI usage: {e}")
+        ai_usage = {
+            'calls': len(ai_calls),
+            'prompt_tokens': sum(call['usage']['prompt_tokens'] for call in ai_calls),
+            'response_tokens': sum(call['usage']['response_tokens'] for call in ai_calls),
+            'latency_ms': round(sum(call['latency_ms'] for call in ai_calls), 1)
+        }
         
-        if not battle_questions or (isinstance(battle_questions, dict) and 'error' in battle_questions):
-            error_msg = battle_questions.get('error') if isinstance(battle_questions, dict) else "AI Battle Commander failed to generate questions."
+        if not battle_sets or 'error' in battle_sets:
+            error_msg = battle_sets.get('error') if isinstance(battle_sets, dict) else "AI Battle Commander failed to generate questions."
             status_code = 429 if "Quota Exceeded" in error_msg else 500
             return JsonResponse({'error': error_msg}, status=status_code)
             
-        if 'questions' not in battle_questions or not battle_questions['questions']:
-            return JsonResponse({'error': 'Generated questions are invalid. Please try again.'}, status=500)
+        # A quiz that stayed short after every re-ask is kept only if it still meets the minimum
+        counts = {level: len(battle_questions.get('questions', [])) for level, battle_questions in battle_sets.items()}
+        battle_sets = {level: battle_sets[level] for level, count in counts.items() if count >= MIN_BATTLE_QUESTIONS}
+        if not battle_sets:
+            return JsonResponse({
+                'error': f'Only {max(counts.values(), default=0)} valid questions could be generated '
+                         f'(minimum {MIN_BATTLE_QUESTIONS}). Please try again.'
+            }, status=500)
             
-        for i, q in enumerate(battle_questions['questions']):
-            if not q.get('question') or not q.get('correct_answer'):
-                return JsonResponse({'error': f'Question {i+1} is incomplete. Please try again.'}, status=500)
-                
-        battle_result_filename = f"iqbattle_result_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        battle_result_path = os.path.join(RESULTS_FOLDER, battle_result_filename)
-        
-        question_formation = {}
-        if 'questions' in battle_questions:
-            for q in battle_questions['questions']:
-                qtype = q.get('type', 'mcq')
-                question_formation[qtype] = question_formation.get(qtype, 0) + 1
-                
-        battle_archive = {
-            'battle_document': battle_filename,
-            'deployment_timestamp': datetime.now().isoformat(),
-            'battle_parameters': {
-                'num_questions': num_questions,
-                'difficulty_protocol': difficulty,
+        # The quiz shown first is the requested difficulty; sibling sets share a group so switching needs no AI call
+        if difficulty not in battle_sets:
+            difficulty = next(iter(battle_sets))
+        difficulty_group = secrets.token_hex(8) if all_difficulties else None
+        stored = {}
+        for level, battle_questions in battle_sets.items():
+            battle_parameters = {
+                'num_questions': len(battle_questions['questions']),
+                'requested_questions': num_questions,
+                'difficulty_protocol': level,
                 'battle_mode': question_types,
-                'question_formation': question_formation
-            },
-            'battle_system': 'IQBattle_v2.0_AI_Enhanced',
-            'battle_commander': 'Google_AI_Gemini_1.5_Flash',
-            'battle_data': battle_questions
-        }
-        
-        with open(battle_result_path, 'w') as f:
-            json.dump(battle_archive, f, indent=2)
+                'page_range': [selected_pages.start + 1, selected_pages.stop] if selected_pages else None,
+                'outline_title': outline_title or None
+            }
+            stored[level] = archive_battle(user, battle_file, battle_filename, battle_questions, battle_parameters,
+                                           ai_route, metrics_by_difficulty[level], difficulty_group)
             
-        try:
-            user = User.objects.get(id=user_id)
-            Quiz.objects.create(
-                user=user,
-                result_filename=battle_result_filename,
-                original_filename=battle_file.name,
-                num_questions=num_questions,
-                difficulty=difficulty,
-                mode=question_types
-            )
-        except Exception as e:
-            print(f"⚠️ Failed to persist quiz metadata: {e}")
+        battle_result_filename, question_formation, quiz = stored[difficulty]
+        battle_questions = battle_sets[difficulty]
+        generation_metrics = metrics_by_difficulty[difficulty]
+        if quiz is not None:
+            ai_calls.link(quiz)
             
-        return JsonResponse({
+        response = {
             'success': True,
             'battle_status': 'VICTORY_ACHIEVED',
             'quiz_data': battle_questions,
             'question_types': question_formation,
             'result_file': battle_result_filename,
+            'ai_route': ai_route,
+            'generation_metrics': generation_metrics,
+            'ai_usage': ai_usage,
             'battle_stats': {
                 'total_questions': sum(question_formation.values()),
+                'requested_questions': num_questions,
+                'partial': sum(question_formation.values()) < num_questions,
                 'battle_mode': question_types,
                 'difficulty_protocol': difficulty,
                 'deployment_time': datetime.now().strftime('%H:%M:%S')
             },
             'message': f'IQBattle deployed: {sum(question_formation.values())} questions ready for intellectual combat!'
-        })
+        }
+        if all_difficulties:
+            response['difficulty_group'] = difficulty_group
+            response['difficulty_sets'] = {
+                level: {
+                    'quiz_id': level_quiz.id if level_quiz else None,
+                    'result_file': result_filename,
+                    'quiz_data': battle_sets[level],
+                    'question_types': formation,
+                    'generation_metrics': metrics_by_difficulty[level]
+                } for level, (result_filename, formation, level_quiz) in stored.items()
+            }
+        return JsonResponse(response)
         
     except Exception as e:
         return JsonResponse({
@@ -463,23 +580,51 @@ def deploy_battle(request):
             'battle_status': 'MISSION_FAILED'
         }, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_pdf_outline(request):
+    if not get_current_user_id(request):
+        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+    if 'pdf_file' not in request.FILES:
+        return JsonResponse({'success': False, 'error': 'No PDF battle document uploaded'}, status=400)
+        
+    try:
+        # Reads the xref, page tree and bookmarks only; no page text is extracted
+        pdf_reader = get_pdf_reader_module().PdfReader(request.FILES['pdf_file'])
+        return JsonResponse({
+            'success': True,
+            'page_count': len(pdf_reader.pages),
+            'outline': read_outline(pdf_reader)
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': f'Could not read PDF: {e}'}, status=400)
+
 @require_http_methods(["GET"])
 def download_battle_results(request, filename):
+    user_id = get_current_user_id(request)
+    if not user_id:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+        
     try:
         fmt = request.GET.get('format', 'json')
-        battle_file_path = os.path.join(RESULTS_FOLDER, filename)
-        if not os.path.exists(battle_file_path):
+        storage = results_storage()
+        # Archives carry every answer, so only the quiz's creator may fetch one
+        if not Quiz.objects.filter(user_id=user_id, result_filename=filename).exists() or not storage.exists(filename):
             raise Http404("Battle archive not found")
             
         if fmt == 'pdf':
-            with open(battle_file_path, 'r') as f:
-                data = json.load(f)
+            data = json.loads(storage.read_bytes(filename))
             pdf_bytes = generate_quiz_pdf(data)
             response = FileResponse(BytesIO(pdf_bytes), content_type='application/pdf')
             response['Content-Disposition'] = f'attachment; filename="{filename.replace(".json", ".pdf")}"'
             return response
             
-        response = FileResponse(open(battle_file_path, 'rb'), content_type='application/json')
+        # Remote backends hand the client a direct/presigned URL instead of proxying the bytes
+        direct_url = storage.url(filename, download_name=filename)
+        if direct_url:
+            return HttpResponseRedirect(direct_url)
+            
+        response = FileResponse(storage.open(filename), content_type='application/json')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
     except Http404:
@@ -498,7 +643,8 @@ def api_my_quizzes(request):
         return JsonResponse({'success': False, 'error': 'Not authenticated'}, status=401)
         
     try:
-        quizzes = Quiz.objects.filter(user_id=user_id).order_by('-id')
+        quizzes = list(Quiz.objects.filter(user_id=user_id).order_by('-id'))
+        usage_by_quiz = quiz_usage([q.id for q in quizzes])
         quizzes_list = [
             {
                 'id': q.id,
@@ -507,29 +653,170 @@ def api_my_quizzes(request):
                 'num_questions': q.num_questions,
                 'difficulty': q.difficulty,
                 'mode': q.mode,
-                'created_at': q.created_at.isoformat()
+                'created_at': q.created_at.isoformat(),
+                'difficulty_group': q.difficulty_group,
+                'ai_usage': usage_by_quiz.get(q.id)
             } for q in quizzes
         ]
         return JsonResponse({'success': True, 'quizzes': quizzes_list, 'user_type': user_type})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+@require_http_methods(["GET"])
+def api_export_my_quizzes(request):
+    user_id = get_current_user_id(request)
+    if not user_id:
+        return JsonResponse({'success': False, 'error': 'Not authenticated'}, status=401)
+        
+    fmt = request.GET.get('format', 'json')
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({'success': False, 'error': 'format must be json, pdf or both'}, status=400)
+        
+    quizzes = Quiz.objects.filter(user_id=user_id).order_by('id').iterator(chunk_size=100)
+    response = StreamingHttpResponse(
+        stream_quiz_library_zip(quizzes, EXPORT_FORMATS[fmt], generate_quiz_pdf),
+        content_type='application/zip'
+    )
+    response['Content-Disposition'] = f'attachment; filename="quezal_library_{datetime.now().strftime("%Y%m%d")}.zip"'
+    # Keep proxies from buffering the stream so the first bytes reach the client straight away
+    response['X-Accel-Buffering'] = 'no'
+    response['Cache-Control'] = 'no-store'
+    return response
+
 @csrf_exempt
-@require_http_methods(["DELETE"])
-def api_delete_my_quiz(request, quiz_id):
+@require_http_methods(["POST"])
+def api_quiz_variants(request, quiz_id):
     user_id = get_current_user_id(request)
     if not user_id:
         return JsonResponse({'success': False, 'error': 'Not authenticated'}, status=401)
         
     try:
+        data = json.loads(request.body) if request.body else {}
+        count = int(data.get('count', 4))
+        subset_size = int(data['subset_size']) if data.get('subset_size') else None
+        fmt = data.get('format', 'json')
+        seed = data.get('seed')
+        if seed in (None, ''):
+            seed = secrets.randbelow(10 ** 9)
+        if not 1 <= count <= settings.VARIANT_MAX_COUNT:
+            return JsonResponse({'success': False, 'error': f'count must be between 1 and {settings.VARIANT_MAX_COUNT}'}, status=400)
+        if subset_size is not None and subset_size < 1:
+            return JsonResponse({'success': False, 'error': 'subset_size must be positive'}, status=400)
+        if fmt not in ('json', 'pdf'):
+            return JsonResponse({'success': False, 'error': 'format must be json or pdf'}, status=400)
+            
         quiz = Quiz.objects.get(id=quiz_id, user_id=user_id)
-        quiz.delete()
-        return JsonResponse({'success': True})
+        quiz_data = json.loads(results_storage().read_bytes(quiz.result_filename))
+        questions = quiz_data.get('battle_data', {}).get('questions', [])
+        if not questions:
+            return JsonResponse({'success': False, 'error': 'Quiz has no questions'}, status=400)
+            
+        variants = derive_variants(questions, seed, count, subset_size)
+        if fmt == 'pdf':
+            title = os.path.splitext(quiz.original_filename or '')[0] or 'Quezal Quiz'
+            response = StreamingHttpResponse(stream_variant_zip(variants, title, seed), content_type='application/zip')
+            response['Content-Disposition'] = f'attachment; filename="quiz_{quiz.id}_variants_{seed}.zip"'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+            
+        return JsonResponse({'success': True, 'quiz_id': quiz.id, 'seed': seed, 'variants': variants})
+    except (TypeError, ValueError) as e:
+        return JsonResponse({'success': False, 'error': f'Invalid variant parameters: {e}'}, status=400)
+    except (Quiz.DoesNotExist, FileNotFoundError):
+        return JsonResponse({'success': False, 'error': 'Quiz not found'}, status=404)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+@require_http_methods(["GET"])
+def api_quiz_difficulties(request, quiz_id):
+    """Every stored difficulty of a quiz's document, read from storage with no AI call."""
+    user_id = get_current_user_id(request)
+    if not user_id:
+        return JsonResponse({'success': False, 'error': 'Not authenticated'}, status=401)
+        
+    try:
+        quiz = Quiz.objects.get(id=quiz_id, user_id=user_id)
+        siblings = [quiz]
+        if quiz.difficulty_group:
+            siblings = list(Quiz.objects.filter(user_id=user_id, difficulty_group=quiz.difficulty_group))
+        order = {level: index for index, level in enumerate(DIFFICULTIES)}
+        siblings.sort(key=lambda q: (order.get(q.difficulty, len(order)), q.id))
+        sets = {}
+        for sibling in siblings:
+            try:
+                questions = load_questions(sibling)
+            except FileNotFoundError:
+                continue
+            sets[sibling.difficulty] = {
+                'quiz_id': sibling.id,
+                'result_file': sibling.result_filename,
+                'num_questions': sibling.num_questions,
+                'quiz_data': {'questions': questions},
+                'question_types': question_formation_of({'questions': questions})
+            }
+        return JsonResponse({
+            'success': True,
+            'quiz_id': quiz.id,
+            'difficulty': quiz.difficulty,
+            'difficulty_group': quiz.difficulty_group,
+            'difficulty_sets': sets
+        })
     except Quiz.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Quiz not found'}, status=404)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+@csrf_exempt
+@require_http_methods(["DELETE"])
+def api_delete_my_quiz(request, quiz_id):
+    user_id = get_current_user_id(request)
+    if not user_id:
+        return JsonResponse({'success': False, 'error': 'Not authenticated'}, status=401)
+        
+    try:
+        deleted_ids, _ = delete_quizzes(user_id, [quiz_id])
+        if not deleted_ids:
+            return JsonResponse({'success': False, 'error': 'Quiz not found'}, status=404)
+        return JsonResponse({'success': True})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_bulk_delete_my_quizzes(request):
+    user_id = get_current_user_id(request)
+    if not user_id:
+        return JsonResponse({'success': False, 'error': 'Not authenticated'}, status=401)
+        
+    try:
+        data = json.loads(request.body) if request.body else {}
+        quiz_ids = data.get('quiz_ids')
+        if not isinstance(quiz_ids, list) or not quiz_ids:
+            return JsonResponse({'success': False, 'error': 'quiz_ids must be a non-empty list'}, status=400)
+        try:
+            quiz_ids = [int(quiz_id) for quiz_id in quiz_ids]
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'error': 'quiz_ids must contain integers'}, status=400)
+            
+        deleted_ids, missing_ids = delete_quizzes(user_id, quiz_ids)
+        return JsonResponse({'success': True, 'deleted': deleted_ids, 'not_found': missing_ids})
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON body'}, status=400)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+@require_http_methods(["GET"])
+def api_my_usage(request):
+    user_id = get_current_user_id(request)
+    if not user_id:
+        return JsonResponse({'success': False, 'error': 'Not authenticated'}, status=401)
+        
+    try:
+        user = User.objects.get(id=user_id)
+        return JsonResponse({'success': True, 'usage': usage_summary(user)})
+    except User.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'User not found'}, status=404)
+
 @csrf_exempt
 @require_http_methods(["GET", "PUT"])
 def api_profile(request):
@@ -588,15 +875,19 @@ def get_battle_statistics(request):
             'battle_system_status': 'OPERATIONAL'
         }
         
-        if os.path.exists(RESULTS_FOLDER):
-            battle_files = [f for f in os.listdir(RESULTS_FOLDER) if f.endswith('.json')]
-            battle_stats['total_battles'] = len(battle_files)
-            
-            for battle_file in sorted(battle_files)[-10:]:
-                battle_path = os.path.join(RESULTS_FOLDER, battle_file)
+        # Count and pick recent archives from the Quiz table rather than scanning the results folder
+        storage = results_storage()
+        battle_stats['total_battles'] = Quiz.objects.count()
+        regeneration_stats = Quiz.objects.aggregate(total=Sum('regenerations'), average=Avg('regenerations'))
+        battle_stats['regenerations'] = {
+            'total': regeneration_stats['total'] or 0,
+            'average_per_quiz': round(regeneration_stats['average'] or 0, 3)
+        }
+        battle_files = list(Quiz.objects.order_by('-id').values_list('result_filename', flat=True)[:10])
+        if battle_files:
+            for battle_file in reversed(battle_files):
                 try:
-                    with open(battle_path, 'r') as f:
-                        battle_data = json.load(f)
+                    battle_data = json.loads(storage.read_bytes(battle_file))
                     
                     if 'battle_parameters' in battle_data and 'question_formation' in battle_data['battle_parameters']:
                         formations = battle_data['battle_parameters']['question_formation']
@@ -637,33 +928,117 @@ def api_take_quiz(request, quiz_id):
         
     try:
         quiz = Quiz.objects.select_related('user').get(id=quiz_id)
-        quiz_file_path = os.path.join(RESULTS_FOLDER, quiz.result_filename)
-        
-        if not os.path.exists(quiz_file_path):
+        try:
+            # Answer-free payload, serialised and compressed once per quiz; answers come from the check/submit endpoints
+            encodings = cached_student_payload(quiz)
+        except FileNotFoundError:
             return JsonResponse({'success': False, 'error': 'Quiz file not found'}, status=404)
             
-        with open(quiz_file_path, 'r', encoding='utf-8') as f:
-            quiz_data = json.load(f)
-            
-        return JsonResponse({
-            'success': True,
-            'quiz': {
-                'id': quiz.id,
-                'filename': quiz.result_filename,
-                'original_filename': quiz.original_filename,
-                'num_questions': quiz.num_questions,
-                'difficulty': quiz.difficulty,
-                'mode': quiz.mode,
-                'created_at': quiz.created_at.isoformat(),
-                'creator_name': quiz.user.name,
-                'questions': quiz_data.get('battle_data', {}).get('questions', [])
-            }
-        })
+        return compressed_json_response(request, encodings)
     except Quiz.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Quiz not found'}, status=404)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+def student_quiz_answers(request, quiz_id):
+    """Return ``(answers, None)`` for a student session, or ``(None, error_response)``."""
+    if not get_current_user_id(request):
+        return None, JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+    if get_current_user_type(request) != 'student':
+        return None, JsonResponse({'success': False, 'error': 'Only students can take quizzes'}, status=403)
+    try:
+        quiz = Quiz.objects.only('id', 'result_filename').get(id=quiz_id)
+        return cached_answers(quiz), None
+    except (Quiz.DoesNotExist, FileNotFoundError):
+        return None, JsonResponse({'success': False, 'error': 'Quiz not found'}, status=404)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_check_quiz_answer(request, quiz_id, number):
+    answers, error_response = student_quiz_answers(request, quiz_id)
+    if error_response:
+        return error_response
+        
+    try:
+        data = json.loads(request.body) if request.body else {}
+        if 'answer' not in data:
+            return JsonResponse({'success': False, 'error': 'answer is required'}, status=400)
+        if not 1 <= number <= len(answers):
+            return JsonResponse({'success': False, 'error': 'Question not found'}, status=404)
+        already_checked = str(number) in locked_answers(request.session, quiz_id)
+        given = lock_answer(request.session, quiz_id, number, data['answer'])
+        return JsonResponse({'success': True, 'result': dict(reveal(answers[number - 1], number, given),
+                                                             locked=already_checked)})
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON body'}, status=400)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def api_submit_quiz(request, quiz_id):
+    answers, error_response = student_quiz_answers(request, quiz_id)
+    if error_response:
+        return error_response
+        
+    try:
+        data = json.loads(request.body) if request.body else {}
+        given = data.get('answers')
+        if not isinstance(given, dict):
+            return JsonResponse({'success': False, 'error': 'answers must map question numbers to answers'}, status=400)
+        given = dict(given, **locked_answers(request.session, quiz_id))
+        results = [reveal(key, number, given.get(str(number))) for number, key in enumerate(answers, start=1)]
+        graded = [r for r in results if r['correct'] is not None]
+        return JsonResponse({
+            'success': True,
+            'score': sum(1 for r in graded if r['correct']),
+            'gradable': len(graded),
+            'total': len(results),
+            'results': results
+        })
+    except json.JSONDecodeError:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON body'}, status=400)
+
+def profiler_access_allowed(request):
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_staff) or header_allowed(request)
+
+@require_http_methods(["GET"])
+def api_admin_profiles(request):
+    if not profiler_access_allowed(request):
+        return JsonResponse({'success': False, 'error': 'Admin access required'}, status=403)
+        
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 200)
+        path_filter = request.GET.get('path')
+        profiles = load_profiles()
+        if path_filter:
+            profiles = [p for p in profiles if p.get('path', '').startswith(path_filter)]
+        profiles.sort(key=lambda p: p.get('duration_ms', 0), reverse=True)
+        return JsonResponse({'success': True, 'profiles': [
+            {
+                'profile_id': p['profile_id'],
+                'method': p.get('method'),
+                'path': p.get('path'),
+                'status_code': p.get('status_code'),
+                'trigger': p.get('trigger'),
+                'captured_at': p.get('captured_at'),
+                'duration_ms': p.get('duration_ms'),
+                'samples': p.get('samples'),
+                'top_functions': p.get('top_functions', {}).get('self', [])[:5]
+            } for p in profiles[:limit]
+        ]})
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'limit must be an integer'}, status=400)
+
+@require_http_methods(["GET"])
+def api_admin_profile_detail(request, profile_id):
+    if not profiler_access_allowed(request):
+        return JsonResponse({'success': False, 'error': 'Admin access required'}, status=403)
+        
+    for profile in load_profiles():
+        if profile['profile_id'] == profile_id:
+            return JsonResponse({'success': True, 'profile': profile})
+    return JsonResponse({'success': False, 'error': 'Profile not found'}, status=404)
+
 @require_http_methods(["GET"])
 def battle_system_health(request):
     try:
@@ -671,9 +1046,12 @@ def battle_system_health(request):
             'battle_system': 'IQBattle_v2.0_Django',
             'ai_commander': 'Google_AI_Gemini_1.5_Flash',
             'system_status': 'OPERATIONAL',
-            'battle_arsenal_ready': os.path.exists(UPLOAD_FOLDER),
-            'battle_archives_ready': os.path.exists(RESULTS_FOLDER),
-            'ai_credentials_loaded': bool(os.getenv("GOOGLE_API_KEY")),
+            'storage_backend': results_storage().backend,
+            'battle_arsenal_ready': upload_storage().is_ready(),
+            'battle_archives_ready': results_storage().is_ready(),
+            'ai_credentials_loaded': bool(get_router().routes),
+            'ai_routes': get_router().snapshot(),
+            'generations_in_flight': in_flight_generations(),
             'max_arsenal_size': '16MB',
             'supported_battle_modes': ['mixed', 'mcq', 'true_false', 'fill_blank', 'essay'],
             'last_system_check': datetime.now().isoformat()
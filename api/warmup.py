@@ -0,0 +1,65 @@
+import time
+
+from django.db import connections
+from django.template.loader import get_template
+
+
+WARM_TEMPLATES = ['index.html', 'user.html']
+
+
+def warm_modules():
+    from . import views
+    from .pdf import get_reportlab
+    views.get_pdf_reader_module()
+    views.get_http_client()
+    get_reportlab()
+    from .prompts import precompile_prompts
+    precompile_prompts()
+
+
+def warm_storage():
+    from .storage import upload_storage, results_storage
+    upload_storage().is_ready()
+    results_storage().is_ready()
+
+
+def warm_templates():
+    for name in WARM_TEMPLATES:
+        get_template(name)
+
+
+def warm_database():
+    for conn in connections.all():
+        conn.ensure_connection()
+
+
+def close_database():
+    for conn in connections.all():
+        conn.close()
+
+
+def warm_up(prime_db=True):
+    """Load heavy modules, compile templates and optionally open DB connections.
+
+    Run without ``prime_db`` in the gunicorn master so forked workers never
+    inherit a live database socket, and with it in each worker after fork.
+    """
+    started = time.perf_counter()
+    for step in (warm_modules, warm_storage, warm_templates):
+        try:
+            step()
+        except Exception as e:
+            print(f"⚠️ Warm-up step {step.__name__} failed: {e}")
+    if prime_db:
+        try:
+            warm_database()
+        except Exception as e:
+            print(f"⚠️ Warm-up database priming failed: {e}")
+    else:
+        try:
+            close_database()
+        except Exception as e:
+            print(f"⚠️ Warm-up database close failed: {e}")
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"🔥 Battle system warmed up in {elapsed_ms:.1f}ms")
+    return elapsed_ms
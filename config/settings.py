@@ -41,6 +41,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.profiling.SamplingProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -74,6 +75,22 @@ DATABASES = {
 }
 
 
+# Cache shared by all workers/instances (admission control, locks). Without REDIS_URL each process has its own.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -117,3 +134,65 @@ CSRF_COOKIE_SECURE = True
 # Trust Vercel proxy for HTTPS
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
+
+# Blob storage for uploaded PDFs and generated quiz archives.
+# 'local' keeps them under BASE_DIR; 's3' shares them across instances via any S3-compatible service.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')
+STORAGE_S3_BUCKET = os.getenv('STORAGE_S3_BUCKET', '')
+STORAGE_S3_PREFIX = os.getenv('STORAGE_S3_PREFIX', '')
+STORAGE_S3_ENDPOINT_URL = os.getenv('STORAGE_S3_ENDPOINT_URL', '')
+STORAGE_S3_REGION = os.getenv('STORAGE_S3_REGION', '')
+STORAGE_S3_ACCESS_KEY_ID = os.getenv('STORAGE_S3_ACCESS_KEY_ID', '')
+STORAGE_S3_SECRET_ACCESS_KEY = os.getenv('STORAGE_S3_SECRET_ACCESS_KEY', '')
+STORAGE_S3_PUBLIC_BASE_URL = os.getenv('STORAGE_S3_PUBLIC_BASE_URL', '')
+STORAGE_S3_PRESIGN_EXPIRY = int(os.getenv('STORAGE_S3_PRESIGN_EXPIRY', '3600'))
+
+# Storage lifecycle: raw upload retention (0 keeps uploads forever), orphan grace period and background GC cadence.
+STORAGE_UPLOAD_RETENTION_DAYS = int(os.getenv('STORAGE_UPLOAD_RETENTION_DAYS', '7'))
+STORAGE_ORPHAN_GRACE_SECONDS = int(os.getenv('STORAGE_ORPHAN_GRACE_SECONDS', '3600'))
+STORAGE_GC_INTERVAL_SECONDS = int(os.getenv('STORAGE_GC_INTERVAL_SECONDS', '3600'))
+
+# Gemini routing: comma-separated key and model pools (GOOGLE_API_KEY still works for a single key).
+GEMINI_API_KEYS = os.getenv('GOOGLE_API_KEYS') or os.getenv('GOOGLE_API_KEY', '')
+GEMINI_MODELS = os.getenv('GEMINI_MODELS', 'gemini-flash-latest')
+GEMINI_API_BASE = os.getenv('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com/v1beta')
+GEMINI_TIMEOUT_SECONDS = float(os.getenv('GEMINI_TIMEOUT_SECONDS', '60'))
+GEMINI_KEY_RPM_LIMIT = int(os.getenv('GEMINI_KEY_RPM_LIMIT', '0'))
+GEMINI_QUOTA_COOLDOWN_SECONDS = float(os.getenv('GEMINI_QUOTA_COOLDOWN_SECONDS', '60'))
+GEMINI_HEDGE_ENABLED = os.getenv('GEMINI_HEDGE_ENABLED', 'False') == 'True'
+GEMINI_HEDGE_MIN_SAMPLES = int(os.getenv('GEMINI_HEDGE_MIN_SAMPLES', '10'))
+
+# Admission control for quiz generation: per-user token bucket and a global in-flight cap.
+GENERATION_RATE_PER_MINUTE = float(os.getenv('GENERATION_RATE_PER_MINUTE', '2'))
+GENERATION_BURST = int(os.getenv('GENERATION_BURST', '3'))
+GENERATION_MAX_IN_FLIGHT = int(os.getenv('GENERATION_MAX_IN_FLIGHT', '4'))
+# Threads per gunicorn worker (same env var as gunicorn.conf.py); generations never take the last one.
+WORKER_THREADS = int(os.getenv('GUNICORN_THREADS', '4'))
+# Minimum slot lifetime; slots actually live for the worst-case generation time when that is longer.
+GENERATION_SLOT_TIMEOUT_SECONDS = int(os.getenv('GENERATION_SLOT_TIMEOUT_SECONDS', '180'))
+GENERATION_RETRY_AFTER_SECONDS = int(os.getenv('GENERATION_RETRY_AFTER_SECONDS', '10'))
+
+# Targeted re-asks when the AI returns fewer valid questions than requested.
+GENERATION_MAX_REASKS = int(os.getenv('GENERATION_MAX_REASKS', '2'))
+
+# Prompt template version: 'v2' is compact with JSON response mode, 'v1' the original mission briefing.
+GEMINI_PROMPT_VERSION = os.getenv('GEMINI_PROMPT_VERSION', 'v2')
+
+# Exam variants: upper bound per request and processes used to render variant PDFs.
+VARIANT_MAX_COUNT = int(os.getenv('VARIANT_MAX_COUNT', '60'))
+VARIANT_RENDER_PROCESSES = int(os.getenv('VARIANT_RENDER_PROCESSES', str(min(4, os.cpu_count() or 1))))
+
+# Opt-in sampling profiler: share of requests profiled, opt-in header token, sampling interval and retained files.
+PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', '0'))
+PROFILER_TOKEN = os.getenv('PROFILER_TOKEN', '')
+PROFILER_INTERVAL_MS = float(os.getenv('PROFILER_INTERVAL_MS', '5'))
+PROFILER_DIR = os.getenv('PROFILER_DIR', os.path.join(BASE_DIR, 'request_profiles'))
+PROFILER_MAX_FILES = int(os.getenv('PROFILER_MAX_FILES', '200'))
+
+# AI usage accounting: default per-user daily token budget (0 = unlimited; User.daily_token_budget overrides) and pricing.
+USER_DAILY_TOKEN_BUDGET = int(os.getenv('USER_DAILY_TOKEN_BUDGET', '0'))
+GEMINI_INPUT_COST_PER_MILLION = float(os.getenv('GEMINI_INPUT_COST_PER_MILLION', '0.30'))
+GEMINI_OUTPUT_COST_PER_MILLION = float(os.getenv('GEMINI_OUTPUT_COST_PER_MILLION', '2.50'))
+
+# Pre-serialised, pre-compressed student quiz payloads and answer keys.
+STUDENT_PAYLOAD_CACHE_SECONDS = int(os.getenv('STUDENT_PAYLOAD_CACHE_SECONDS', '3600'))
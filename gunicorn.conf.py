@@ -0,0 +1,37 @@
+import os
+
+# Gunicorn configuration tuned for fast cold starts on small Render instances.
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+# Threads leave room for cheap requests while generations (capped by GENERATION_MAX_IN_FLIGHT) wait on Gemini.
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# Load Django and the heavy modules once in the master so workers fork warm.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+
+def when_ready(server):
+    # Without preload the master never loads Django, so there is nothing to warm here
+    if not server.cfg.preload_app:
+        return
+    from api.warmup import warm_up
+    warm_up(prime_db=False)
+
+
+def start_worker():
+    from api.warmup import warm_up
+    from api.lifecycle import start_background_gc
+    warm_up(prime_db=True)
+    start_background_gc()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        start_worker()
+
+
+def post_worker_init(worker):
+    # Without preload each worker only has Django once its app is loaded, which is after post_fork
+    if not worker.cfg.preload_app:
+        start_worker()